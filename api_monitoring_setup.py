@@ -9,13 +9,19 @@ This script:
 5. Provides a URL to access the monitoring dashboard
 """
 import os
-import json
+import functools
 import urllib.parse
-import time
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from elasticsearch import Elasticsearch
+from pathlib import Path
+from uuid import uuid4
+import numpy as np
+import orjson
+from elasticsearch import BadRequestError, Elasticsearch
 from elasticsearch.client import MlClient
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch.serializer import JSONSerializer
 
 # Configuration parameters (normally would be in .env)
 ELASTICSEARCH_CLOUD_ID = os.getenv("ELASTICSEARCH_CLOUD_ID", 
@@ -24,29 +30,173 @@ ELASTICSEARCH_USERNAME = os.getenv("ELASTICSEARCH_USERNAME", "elastic")
 ELASTICSEARCH_PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "KIuc03ZYAf6IqGkE1zEap1DR")
 KIBANA_BASE_URL = os.getenv("KIBANA_BASE_URL", "https://ai-agent-monitoring.kb.us-east-2.aws.elastic-cloud.com")
 
-# Create directories for storing configurations
-os.makedirs("jobs", exist_ok=True)
-os.makedirs("dashboards", exist_ok=True)
-os.makedirs("alerts", exist_ok=True)
+# Bulk indexing parameters for the sample data load
+BULK_THREAD_COUNT = int(os.getenv("BULK_THREAD_COUNT", str(min(4, os.cpu_count() or 1))))
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024  # 10MB
+BULK_REQUEST_TIMEOUT = 60  # seconds
 
-# Connect to Elasticsearch
-print("Connecting to Elasticsearch...")
-try:
-    es = Elasticsearch(
-        cloud_id=ELASTICSEARCH_CLOUD_ID,
-        basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD)
-    )
+# Status codes and error types drawn for failed sample requests
+ERROR_STATUS_CODES = np.array([500, 502, 503, 504])
+ERROR_TYPES = np.array(["timeout", "internal_error", "bad_gateway"])
+
+# Index settings applied to the sample data index while it is bulk loaded,
+# and the settings it is put back to once the load is done
+BULK_LOAD_SETTINGS = {
+    "index": {
+        "refresh_interval": "-1",
+        "number_of_replicas": 0,
+        "translog": {
+            "durability": "async",
+            "flush_threshold_size": "1gb"
+        }
+    }
+}
+SERVING_SETTINGS = {
+    "index": {
+        "refresh_interval": None,  # Back to the cluster default
+        "number_of_replicas": 1,
+        "translog": {
+            "durability": "request",
+            "flush_threshold_size": None
+        }
+    }
+}
+
+# Dashboard panel layouts, serialized once at import time
+OVERVIEW_PANELS_JSON = orjson.dumps([
+    # Response time metrics panel
+    {
+        "id": "response-time-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 0,
+            "y": 0,
+            "w": 24,
+            "h": 12,
+            "i": "1"
+        },
+        "version": "7.10.0",
+        "panelIndex": "1"
+    },
+    # Error rate metrics panel
+    {
+        "id": "error-rate-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 24,
+            "y": 0,
+            "w": 24,
+            "h": 12,
+            "i": "2"
+        },
+        "version": "7.10.0",
+        "panelIndex": "2"
+    },
+    # API health by environment panel
+    {
+        "id": "api-health-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 0,
+            "y": 12,
+            "w": 48,
+            "h": 12,
+            "i": "3"
+        },
+        "version": "7.10.0",
+        "panelIndex": "3"
+    }
+]).decode()
+
+ANOMALY_PANELS_JSON = orjson.dumps([
+    # Response time anomalies panel
+    {
+        "id": "response-time-anomalies-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 0,
+            "y": 0,
+            "w": 48,
+            "h": 12,
+            "i": "1"
+        },
+        "version": "7.10.0",
+        "panelIndex": "1"
+    },
+    # Error rate anomalies panel
+    {
+        "id": "error-rate-anomalies-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 0,
+            "y": 12,
+            "w": 24,
+            "h": 12,
+            "i": "2"
+        },
+        "version": "7.10.0",
+        "panelIndex": "2"
+    },
+    # Anomaly severity distribution panel
+    {
+        "id": "anomaly-severity-panel",
+        "type": "visualization",
+        "gridData": {
+            "x": 24,
+            "y": 12,
+            "w": 24,
+            "h": 12,
+            "i": "3"
+        },
+        "version": "7.10.0",
+        "panelIndex": "3"
+    }
+]).decode()
+
+# JSON serializer backed by orjson, used for every request body including
+# each action line of the bulk requests
+class OrjsonSerializer(JSONSerializer):
+    def dumps(self, data):
+        # Bodies that are already encoded are passed through unchanged
+        if isinstance(data, (str, bytes)):
+            return super().dumps(data)
+        return orjson.dumps(data, default=self.default)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+# Function returning the Elasticsearch client, connecting on first use
+@functools.lru_cache(maxsize=1)
+def get_client():
+    print("Connecting to Elasticsearch...")
+    try:
+        es = Elasticsearch(
+            cloud_id=ELASTICSEARCH_CLOUD_ID,
+            basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD),
+            serializer=OrjsonSerializer(),
+            # Keep enough pooled keep-alive connections for the parallel bulk
+            # threads and compress the (highly repetitive) JSON bodies
+            http_compress=True,
+            connections_per_node=25,
+            request_timeout=60,
+            retry_on_timeout=True,
+            max_retries=3
+        )
+        
+        # Test connection
+        info = es.info()
+        print(f"Successfully connected to Elasticsearch cluster: {info['cluster_name']}")
+    except Exception as e:
+        print(f"Failed to connect to Elasticsearch: {e}")
+        exit(1)
     
-    # Test connection
-    info = es.info()
-    print(f"Successfully connected to Elasticsearch cluster: {info['cluster_name']}")
-except Exception as e:
-    print(f"Failed to connect to Elasticsearch: {e}")
-    exit(1)
+    return es
 
 # Function to create indices if they don't exist
 def create_indices():
     print("Creating required indices...")
+    es = get_client()
     
     # API metrics index template
     api_metrics_template = {
@@ -68,7 +218,7 @@ def create_indices():
                     "is_error": {"type": "boolean"},
                     "error_type": {"type": "keyword"},
                     "error_count": {"type": "integer"},
-                    "request_id": {"type": "keyword"}
+                    "request_id": {"type": "keyword", "doc_values": False}  # Lookup only, never aggregated
                 }
             }
         }
@@ -90,7 +240,7 @@ def create_indices():
                     "api_id": {"type": "keyword"},
                     "environment": {"type": "keyword"},
                     "severity": {"type": "float"},
-                    "description": {"type": "text"},
+                    "description": {"type": "text", "norms": False},  # Not used for relevance scoring
                     "affected_endpoints": {"type": "keyword"},
                     "anomaly_score": {"type": "float"}
                 }
@@ -103,21 +253,26 @@ def create_indices():
         es.indices.put_index_template(name="api_metrics_template", body=api_metrics_template)
         es.indices.put_index_template(name="api_anomalies_template", body=anomalies_template)
         
-        # Create initial indices
-        if not es.indices.exists(index="api_metrics"):
-            es.indices.create(index="api_metrics")
-        
-        if not es.indices.exists(index="api_anomalies"):
-            es.indices.create(index="api_anomalies")
+        # Create initial indices; creating an existing index is rejected by
+        # Elasticsearch, which saves a separate existence check per index
+        for index in ("api_metrics", "api_anomalies"):
+            try:
+                es.indices.create(index=index)
+            except BadRequestError as e:
+                if e.error != "resource_already_exists_exception":
+                    raise
             
         print("Indices created successfully")
     except Exception as e:
         print(f"Error creating indices: {e}")
 
-# Function to generate sample data for testing
-def generate_sample_data():
-    print("Generating sample data...")
-    
+# Function returning the daily index a sample document is written to
+def sample_data_index(timestamp):
+    return f"api_metrics-{timestamp:%Y.%m.%d}"
+
+# Generator yielding the sample documents, so they are streamed to the bulk
+# helper as they are built rather than collected in a list first
+def generate_sample_docs(now):
     # Sample APIs and environments
     apis = [
         {"api_id": "user-service", "endpoints": ["/users", "/users/{id}", "/users/auth"]},
@@ -127,62 +282,63 @@ def generate_sample_data():
     
     environments = ["production", "staging", "development"]
     
-    # Generate data points
-    now = datetime.now()
-    bulk_data = []
-    
-    # Create normal data
-    for day in range(7):
-        for hour in range(24):
-            for api in apis:
-                for endpoint in api["endpoints"]:
-                    for env in environments:
-                        # Base response time varies by environment
-                        base_response_time = {
-                            "production": 75,
-                            "staging": 95,
-                            "development": 120
-                        }[env]
-                        
-                        # Time-based variation (peak hours)
-                        hour_factor = 1 + (0.5 if 9 <= hour <= 17 else 0)
-                        
-                        # Day-based variation (weekends)
-                        day_of_week = (datetime.now().weekday() + day) % 7
-                        day_factor = 0.7 if day_of_week >= 5 else 1.0
-                        
-                        # Calculate response time with some randomness
-                        import random
-                        response_time = base_response_time * hour_factor * day_factor * random.uniform(0.8, 1.2)
-                        
-                        # Occasionally introduce errors
-                        is_error = random.random() < 0.02
-                        status_code = random.choice([500, 502, 503, 504]) if is_error else 200
-                        error_type = random.choice(["timeout", "internal_error", "bad_gateway"]) if is_error else None
-                        error_count = 1 if is_error else 0
-                        
-                        # Timestamp for this data point
-                        timestamp = now - timedelta(days=day, hours=24-hour)
-                        
-                        # Create document
-                        doc = {
-                            "_index": "api_metrics",
-                            "_source": {
-                                "@timestamp": timestamp.isoformat(),
-                                "api_id": api["api_id"],
-                                "api_endpoint": endpoint,
-                                "environment": env,
-                                "service_name": api["api_id"],
-                                "response_time_ms": response_time,
-                                "status_code": status_code,
-                                "is_error": is_error,
-                                "error_type": error_type,
-                                "error_count": error_count,
-                                "request_id": f"req-{int(time.time())}-{random.randint(1000, 9999)}"
-                            }
-                        }
-                        
-                        bulk_data.append(doc)
+    # Create normal data: one point per (day, hour, endpoint, environment),
+    # with the numeric fields generated for all points at once
+    rng = np.random.default_rng()
+    series = [(api["api_id"], endpoint) for api in apis for endpoint in api["endpoints"]]
+    days, hours, series_idx, env_idx = (
+        grid.ravel() for grid in np.meshgrid(
+            np.arange(7), np.arange(24), np.arange(len(series)), np.arange(len(environments)),
+            indexing="ij"
+        )
+    )
+    num_points = days.size
+    
+    # Base response time varies by environment
+    base_response_time = np.array([75, 95, 120])[env_idx]
+    
+    # Time-based variation (peak hours)
+    hour_factor = np.where((hours >= 9) & (hours <= 17), 1.5, 1.0)
+    
+    # Day-based variation (weekends)
+    day_of_week = (now.weekday() + days) % 7
+    day_factor = np.where(day_of_week >= 5, 0.7, 1.0)
+    
+    # Calculate response time with some randomness
+    response_times = base_response_time * hour_factor * day_factor * rng.uniform(0.8, 1.2, size=num_points)
+    
+    # Occasionally introduce errors
+    is_errors = rng.random(num_points) < 0.02
+    status_codes = np.where(is_errors, rng.choice(ERROR_STATUS_CODES, size=num_points), 200)
+    error_types = rng.choice(ERROR_TYPES, size=num_points)
+    
+    for day, hour, s_idx, e_idx, response_time, is_error, status_code, error_type in zip(
+            days.tolist(), hours.tolist(), series_idx.tolist(), env_idx.tolist(),
+            response_times.tolist(), is_errors.tolist(), status_codes.tolist(), error_types.tolist()):
+        api_id, endpoint = series[s_idx]
+        
+        # Timestamp for this data point
+        timestamp = now - timedelta(days=day, hours=24-hour)
+        
+        # Create document
+        doc = {
+            "_index": sample_data_index(timestamp),
+            "_source": {
+                "@timestamp": timestamp.isoformat(),
+                "api_id": api_id,
+                "api_endpoint": endpoint,
+                "environment": environments[e_idx],
+                "service_name": api_id,
+                "response_time_ms": response_time,
+                "status_code": status_code,
+                "is_error": is_error,
+                "error_type": error_type if is_error else None,
+                "error_count": 1 if is_error else 0,
+                "request_id": uuid4().hex[:16]
+            }
+        }
+        
+        yield doc
     
     # Introduce some anomalies for demonstration
     # Anomaly 1: Spike in response time for user service in production
@@ -190,7 +346,7 @@ def generate_sample_data():
     for i in range(20):
         spike_time = anomaly_time + timedelta(minutes=i*3)
         doc = {
-            "_index": "api_metrics",
+            "_index": sample_data_index(spike_time),
             "_source": {
                 "@timestamp": spike_time.isoformat(),
                 "api_id": "user-service",
@@ -201,17 +357,17 @@ def generate_sample_data():
                 "status_code": 200,
                 "is_error": False,
                 "error_count": 0,
-                "request_id": f"req-{int(time.time())}-{random.randint(1000, 9999)}"
+                "request_id": uuid4().hex[:16]
             }
         }
-        bulk_data.append(doc)
+        yield doc
     
     # Anomaly 2: Error rate spike for payment service in staging
     anomaly_time = now - timedelta(days=1, hours=12)
     for i in range(30):
         spike_time = anomaly_time + timedelta(minutes=i*2)
         doc = {
-            "_index": "api_metrics",
+            "_index": sample_data_index(spike_time),
             "_source": {
                 "@timestamp": spike_time.isoformat(),
                 "api_id": "payment-service",
@@ -223,17 +379,85 @@ def generate_sample_data():
                 "is_error": True,
                 "error_type": "internal_error",
                 "error_count": 1,
-                "request_id": f"req-{int(time.time())}-{random.randint(1000, 9999)}"
+                "request_id": uuid4().hex[:16]
             }
         }
-        bulk_data.append(doc)
+        yield doc
+
+# Function to generate sample data for testing
+def generate_sample_data():
+    print("Generating sample data...")
+    es = get_client()
+    
+    # Sample data covers the last 7 days, i.e. up to 8 calendar days
+    now = datetime.now()
+    indices = sorted({sample_data_index(now - timedelta(days=day)) for day in range(8)})
     
-    # Insert the data
+    # Insert the data, spreading the chunks over several bulk requests in flight
     try:
-        success, failed = bulk(es, bulk_data)
-        print(f"Sample data generation: {success} documents indexed, {len(failed) if failed else 0} failed")
+        # Create the daily indices up front, skipping refreshes and replica
+        # writes for the duration of the load
+        for index in indices:
+            try:
+                es.indices.create(index=index)
+            except BadRequestError as e:
+                if e.error != "resource_already_exists_exception":
+                    raise
+        es.indices.put_settings(index=indices, settings=BULK_LOAD_SETTINGS)
+
+        success, failed = 0, 0
+        for ok, item in parallel_bulk(es.options(request_timeout=BULK_REQUEST_TIMEOUT),
+                                      generate_sample_docs(now),
+                                      thread_count=BULK_THREAD_COUNT,
+                                      chunk_size=BULK_CHUNK_SIZE,
+                                      max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+                                      raise_on_error=False):
+            # Results are consumed as they arrive; failed documents are
+            # counted rather than aborting the load or being collected
+            if ok:
+                success += 1
+            else:
+                if not failed:
+                    print(f"First failed document: {item}")
+                failed += 1
+        print(f"Sample data generation: {success} documents indexed, {failed} failed")
     except Exception as e:
         print(f"Error generating sample data: {e}")
+    finally:
+        # Restore the normal settings and make the new documents searchable
+        # before the ML datafeeds start reading them
+        try:
+            es.indices.put_settings(index=indices, settings=SERVING_SETTINGS)
+            es.indices.refresh(index=indices)
+        except Exception as e:
+            print(f"Error restoring index settings: {e}")
+
+# Function to write configuration objects to JSON files, keyed by path
+def save_json_configs(configs):
+    for path, config in configs.items():
+        Path(path).write_bytes(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+
+# Function to create a single ML job along with its datafeed, and start it
+def create_ml_job(job):
+    es = get_client()
+    try:
+        es.ml.put_job(job_id=job["job_id"], body=job)
+        print(f"Created job: {job['job_id']}")
+        
+        # Create a datafeed for the job
+        datafeed_id = f"{job['job_id']}-datafeed"
+        datafeed_config = {
+            "job_id": job["job_id"],
+            "indices": ["api_metrics*"],
+            "query": {"match_all": {}}
+        }
+        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
+        print(f"Created datafeed: {datafeed_id}")
+        
+        # Start the datafeed
+        es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
+    except Exception as e:
+        print(f"Error creating ML job {job['job_id']}: {e}")
 
 # Function to create ML jobs
 def create_ml_jobs():
@@ -328,70 +552,17 @@ def create_ml_jobs():
     }
     
     # Save job configs to files
-    with open('jobs/api_response_time.json', 'w') as f:
-        json.dump(response_time_job, f, indent=2)
-    
-    with open('jobs/api_error_rate.json', 'w') as f:
-        json.dump(error_rate_job, f, indent=2)
-    
-    with open('jobs/cross_environment.json', 'w') as f:
-        json.dump(cross_env_job, f, indent=2)
+    save_json_configs({
+        "jobs/api_response_time.json": response_time_job,
+        "jobs/api_error_rate.json": error_rate_job,
+        "jobs/cross_environment.json": cross_env_job
+    })
     
-    # Create the jobs in Elasticsearch
-    try:
-        # Create response time job
-        es.ml.put_job(job_id=response_time_job["job_id"], body=response_time_job)
-        print(f"Created job: {response_time_job['job_id']}")
-        
-        # Create a datafeed for the job
-        datafeed_id = f"{response_time_job['job_id']}-datafeed"
-        datafeed_config = {
-            "job_id": response_time_job["job_id"],
-            "indices": ["api_metrics*"],
-            "query": {"match_all": {}}
-        }
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Created datafeed: {datafeed_id}")
-        
-        # Start the datafeed
-        es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
-        
-        # Create error rate job
-        es.ml.put_job(job_id=error_rate_job["job_id"], body=error_rate_job)
-        print(f"Created job: {error_rate_job['job_id']}")
-        
-        # Create a datafeed for the job
-        datafeed_id = f"{error_rate_job['job_id']}-datafeed"
-        datafeed_config = {
-            "job_id": error_rate_job["job_id"],
-            "indices": ["api_metrics*"],
-            "query": {"match_all": {}}
-        }
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Created datafeed: {datafeed_id}")
-        
-        # Start the datafeed
-        es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
-        
-        # Create cross-environment job
-        es.ml.put_job(job_id=cross_env_job["job_id"], body=cross_env_job)
-        print(f"Created job: {cross_env_job['job_id']}")
-        
-        # Create a datafeed for the job
-        datafeed_id = f"{cross_env_job['job_id']}-datafeed"
-        datafeed_config = {
-            "job_id": cross_env_job["job_id"],
-            "indices": ["api_metrics*"],
-            "query": {"match_all": {}}
-        }
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Created datafeed: {datafeed_id}")
-        
-        # Start the datafeed
-        es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
-        
-    except Exception as e:
-        print(f"Error creating ML jobs: {e}")
+    # Create the jobs in Elasticsearch; each job's create/datafeed/start
+    # sequence is independent, so the jobs are set up concurrently
+    jobs = [response_time_job, error_rate_job, cross_env_job]
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        list(executor.map(create_ml_job, jobs))
 
 # Function to create alert rules
 def create_alerts():
@@ -446,11 +617,10 @@ def create_alerts():
     }
     
     # Save alert configs to files
-    with open('alerts/response_time_alert.json', 'w') as f:
-        json.dump(response_time_rule, f, indent=2)
-    
-    with open('alerts/error_rate_alert.json', 'w') as f:
-        json.dump(error_rate_rule, f, indent=2)
+    save_json_configs({
+        "alerts/response_time_alert.json": response_time_rule,
+        "alerts/error_rate_alert.json": error_rate_rule
+    })
     
     # Note: Creating alert rules requires Kibana API access which is not directly supported
     # by the Elasticsearch Python client. In a real implementation, we would use Kibana API
@@ -478,50 +648,7 @@ def create_visualizations():
             "kibanaSavedObjectMeta": {
                 "searchSourceJSON": "{\"filter\":[]}"
             },
-            "panelsJSON": json.dumps([
-                # Response time metrics panel
-                {
-                    "id": "response-time-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 0,
-                        "y": 0,
-                        "w": 24,
-                        "h": 12,
-                        "i": "1"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "1"
-                },
-                # Error rate metrics panel
-                {
-                    "id": "error-rate-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 24,
-                        "y": 0,
-                        "w": 24,
-                        "h": 12,
-                        "i": "2"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "2"
-                },
-                # API health by environment panel
-                {
-                    "id": "api-health-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 0,
-                        "y": 12,
-                        "w": 48,
-                        "h": 12,
-                        "i": "3"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "3"
-                }
-            ])
+            "panelsJSON": OVERVIEW_PANELS_JSON
         }
     }
     
@@ -541,59 +668,15 @@ def create_visualizations():
             "kibanaSavedObjectMeta": {
                 "searchSourceJSON": "{\"filter\":[]}"
             },
-            "panelsJSON": json.dumps([
-                # Response time anomalies panel
-                {
-                    "id": "response-time-anomalies-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 0,
-                        "y": 0,
-                        "w": 48,
-                        "h": 12,
-                        "i": "1"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "1"
-                },
-                # Error rate anomalies panel
-                {
-                    "id": "error-rate-anomalies-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 0,
-                        "y": 12,
-                        "w": 24,
-                        "h": 12,
-                        "i": "2"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "2"
-                },
-                # Anomaly severity distribution panel
-                {
-                    "id": "anomaly-severity-panel",
-                    "type": "visualization",
-                    "gridData": {
-                        "x": 24,
-                        "y": 12,
-                        "w": 24,
-                        "h": 12,
-                        "i": "3"
-                    },
-                    "version": "7.10.0",
-                    "panelIndex": "3"
-                }
-            ])
+            "panelsJSON": ANOMALY_PANELS_JSON
         }
     }
     
     # Save dashboard configs to files
-    with open('dashboards/api_overview_dashboard.json', 'w') as f:
-        json.dump(api_overview_dashboard, f, indent=2)
-    
-    with open('dashboards/anomaly_dashboard.json', 'w') as f:
-        json.dump(anomaly_dashboard, f, indent=2)
+    save_json_configs({
+        "dashboards/api_overview_dashboard.json": api_overview_dashboard,
+        "dashboards/anomaly_dashboard.json": anomaly_dashboard
+    })
     
     # Note: Creating Kibana visualizations and dashboards requires Kibana API access
     # which is not directly supported by the Elasticsearch Python client.
@@ -624,7 +707,14 @@ def provide_access_urls():
 
 # Main execution flow
 def main():
+    # Connect to Elasticsearch before doing any work
+    get_client()
+    
     try:
+        # Create directories for storing configurations
+        for directory in ("jobs", "dashboards", "alerts"):
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        
         # Step 1: Create necessary indices
         create_indices()
         
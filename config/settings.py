@@ -5,17 +5,67 @@ import os
 import logging
 from typing import List, Dict, Any, Optional, Union
 
+def _env_bool(name: str, default: str) -> bool:
+    """Read a boolean flag from the environment."""
+    return os.getenv(name, default).lower() in ("true", "1", "t")
+
+def _env_int(name: str, default: str) -> int:
+    """Read an integer value from the environment."""
+    return int(os.getenv(name, default))
+
 class Settings:
     """
     Application settings without pydantic.
     """
+    __slots__ = (
+        "DEBUG",
+        "HOST",
+        "PORT",
+        "LOG_LEVEL",
+        "CLOUD_DEPLOYMENT",
+        "CORS_ORIGINS",
+        "MONGODB_URI",
+        "ELASTICSEARCH_HOSTS",
+        "ELASTICSEARCH_USERNAME",
+        "ELASTICSEARCH_PASSWORD",
+        "ELASTICSEARCH_CLOUD_ID",
+        "ELASTICSEARCH_API_KEY",
+        "KIBANA_URL",
+        "COLLECTION_INTERVAL",
+        "ANOMALY_DETECTION_INTERVAL",
+        "ANOMALY_DETECTION_WINDOW",
+        "SLACK_WEBHOOK_URL",
+        "ALERT_DEDUP_TTL_SECONDS",
+        "NOTIFY_TIMEOUT_SECONDS",
+        "NOTIFY_CONCURRENCY",
+        "EMAIL_NOTIFY_TIMEOUT_SECONDS",
+        "ALERT_MAX_POLL_INTERVAL",
+        "EMAIL_ENABLED",
+        "EMAIL_HOST",
+        "EMAIL_PORT",
+        "EMAIL_USERNAME",
+        "EMAIL_PASSWORD",
+        "EMAIL_FROM",
+        "REDIS_HOST",
+        "REDIS_PORT",
+        "REDIS_PASSWORD",
+        "OTEL_EXPORTER_OTLP_ENDPOINT",
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+        "AWS_REGION",
+        "ENVIRONMENTS",
+        "COLLECTOR_THREADS",
+        "ANALYZER_THREADS",
+        "ANALYSIS_CONCURRENCY",
+    )
+
     def __init__(self):
         # Application settings
-        self.DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
+        self.DEBUG = _env_bool("DEBUG", "False")
         self.HOST = os.getenv("HOST", "0.0.0.0")
-        self.PORT = int(os.getenv("PORT", "8000"))
+        self.PORT = _env_int("PORT", "8000")
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-        self.CLOUD_DEPLOYMENT = os.getenv("CLOUD_DEPLOYMENT", "False").lower() in ("true", "1", "t")
+        self.CLOUD_DEPLOYMENT = _env_bool("CLOUD_DEPLOYMENT", "False")
         
         # CORS settings
         self.CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -30,26 +80,33 @@ class Settings:
         self.KIBANA_URL = os.getenv("KIBANA_URL", None)
         
         # Data collection settings
-        self.COLLECTION_INTERVAL = int(os.getenv("COLLECTION_INTERVAL", "60"))  # seconds
+        self.COLLECTION_INTERVAL = _env_int("COLLECTION_INTERVAL", "60")  # seconds
         
         # Anomaly detection settings
-        self.ANOMALY_DETECTION_INTERVAL = int(os.getenv("ANOMALY_DETECTION_INTERVAL", "300"))  # seconds
-        self.ANOMALY_DETECTION_WINDOW = int(os.getenv("ANOMALY_DETECTION_WINDOW", "3600"))  # seconds
+        self.ANOMALY_DETECTION_INTERVAL = _env_int("ANOMALY_DETECTION_INTERVAL", "300")  # seconds
+        self.ANOMALY_DETECTION_WINDOW = _env_int("ANOMALY_DETECTION_WINDOW", "3600")  # seconds
         
         # Alerting settings
         self.SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", None)
+        self.ALERT_DEDUP_TTL_SECONDS = _env_int("ALERT_DEDUP_TTL_SECONDS", "3600")  # seconds
+        self.NOTIFY_TIMEOUT_SECONDS = _env_int("NOTIFY_TIMEOUT_SECONDS", "30")  # seconds
+        self.NOTIFY_CONCURRENCY = _env_int("NOTIFY_CONCURRENCY", "10")
+        # Cap on the idle back-off between anomaly polls; bounds how long a new
+        # anomaly can wait for an alert after a quiet period
+        self.ALERT_MAX_POLL_INTERVAL = _env_int("ALERT_MAX_POLL_INTERVAL", "600")  # seconds
         
         # Email settings
-        self.EMAIL_ENABLED = os.getenv("EMAIL_ENABLED", "False").lower() in ("true", "1", "t")
+        self.EMAIL_ENABLED = _env_bool("EMAIL_ENABLED", "False")
         self.EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-        self.EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+        self.EMAIL_PORT = _env_int("EMAIL_PORT", "587")
         self.EMAIL_USERNAME = os.getenv("EMAIL_USERNAME", "")
         self.EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
         self.EMAIL_FROM = os.getenv("EMAIL_FROM", "alerts@apimonitoring.com")
+        self.EMAIL_NOTIFY_TIMEOUT_SECONDS = _env_int("EMAIL_NOTIFY_TIMEOUT_SECONDS", "60")  # seconds, per batch
         
         # Redis for caching and pub/sub
         self.REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-        self.REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+        self.REDIS_PORT = _env_int("REDIS_PORT", "6379")
         self.REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
         
         # OpenTelemetry settings
@@ -64,8 +121,9 @@ class Settings:
         self.ENVIRONMENTS = os.getenv("ENVIRONMENTS", "on-premises,aws,azure,gcp").split(",")
         
         # System resource settings
-        self.COLLECTOR_THREADS = int(os.getenv("COLLECTOR_THREADS", "5"))
-        self.ANALYZER_THREADS = int(os.getenv("ANALYZER_THREADS", "3"))
+        self.COLLECTOR_THREADS = _env_int("COLLECTOR_THREADS", "5")
+        self.ANALYZER_THREADS = _env_int("ANALYZER_THREADS", "3")
+        self.ANALYSIS_CONCURRENCY = _env_int("ANALYSIS_CONCURRENCY", "16")
 
 # Create settings instance
 settings = Settings()
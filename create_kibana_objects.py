@@ -5,10 +5,19 @@ This script creates Kibana objects (connectors, rules, visualizations) directly
 rather than generating JSON files for import, which can cause extension errors.
 """
 import os
+import sys
+import argparse
 import json
+import atexit
+import functools
+import random
+import urllib.parse
+import orjson
 import requests
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Elasticsearch/Kibana connection information
 ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "https://ai-agent-monitoring.es.us-east-2.aws.elastic-cloud.com")
@@ -16,27 +25,176 @@ KIBANA_HOST = os.getenv("KIBANA_HOST", "https://ai-agent-monitoring.kb.us-east-2
 USERNAME = os.getenv("ELASTICSEARCH_USERNAME", "elastic")
 PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "KIuc03ZYAf6IqGkE1zEap1DR")
 
-# Authentication header
-auth_header = {
-    'Authorization': f'Basic {base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()}'
+# (connect, read) timeouts applied to every Kibana request
+HTTP_TIMEOUT = (3.05, 30)
+
+class KibanaRetry(Retry):
+    """Retry policy that only retries POSTs on responses where nothing was created"""
+    # A 502/504 from a proxy can arrive after Kibana already created the
+    # object, so retrying the POST would create a duplicate. 429 and 503 are
+    # rejections that come with Retry-After.
+    POST_RETRY_STATUSES = frozenset([429, 503])
+    
+    # Upper bound of the random jitter added to each backoff, in seconds
+    BACKOFF_JITTER = 0.5
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST":
+            return status_code in self.POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+    
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, self.BACKOFF_JITTER) if backoff else backoff
+
+# Retry policy for throttled or temporarily unavailable Kibana responses:
+# jittered exponential backoff (1s, 2s, 4s, ...) honouring any Retry-After
+# header, and the last response is handed back to the caller once retries run
+# out. POST is left out of allowed_methods so it is never retried after a read
+# error; KibanaRetry retries it only on 429/503.
+RETRY_POLICY = KibanaRetry(
+    total=5,
+    backoff_factor=1,
+    status_forcelist=[429, 502, 503, 504],
+    allowed_methods=frozenset(["GET", "PUT"]),
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# Shared HTTP session, so all Kibana calls reuse pooled keep-alive connections
+# and send the same authentication and Kibana headers
+SESSION = requests.Session()
+SESSION.auth = (USERNAME, PASSWORD)
+SESSION.headers.update({'kbn-xsrf': 'true', 'Content-Type': 'application/json'})
+KIBANA_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=RETRY_POLICY)
+SESSION.mount("https://", KIBANA_ADAPTER)
+SESSION.mount("http://", KIBANA_ADAPTER)
+atexit.register(SESSION.close)
+
+# Empty KQL search source shared by the saved objects
+SEARCH_SOURCE_JSON = '{"query":{"query":"","language":"kuery"},"filter":[]}'
+
+# Constant parts of the ML anomaly rule payload; the name, job and connector
+# are filled in per rule
+ML_RULE_TEMPLATE = {
+    "tags": ["api", "monitoring", "anomaly"],
+    "params": {
+        "anomalyScoreThreshold": 75  # Alert when anomaly score is above 75
+    },
+    "consumer": "alerts",
+    "schedule": { "interval": "5m" },  # Check every 5 minutes
+    "notify_when": "onActionGroupChange",
+    "rule_type_id": ".ml"
 }
+ML_RULE_ACTION_TEMPLATE = {
+    "group": "threshold_met",
+    "params": {
+        "message": "API Anomaly Detected: {{context.description}}. Score: {{context.anomaly_score}}. API: {{context.api_id}} in {{context.environment}}",
+    }
+}
+
+# Visualization state of the anomaly overview, serialized once
+VIS_STATE_JSON = orjson.dumps({
+    "title": "API Anomalies Overview",
+    "type": "metrics",
+    "params": {
+        "id": "61ca57f0-469d-11e7-af02-69e470af7417",
+        "type": "timeseries",
+        "series": [
+            {
+                "id": "anomaly-score",
+                "color": "#68BC00",
+                "split_mode": "terms",
+                "metrics": [
+                    {
+                        "id": "1",
+                        "type": "max",
+                        "field": "anomaly_score"
+                    }
+                ],
+                "seperate_axis": 0,
+                "axis_position": "right",
+                "formatter": "number",
+                "chart_type": "line",
+                "line_width": 1,
+                "point_size": 1,
+                "fill": 0.5,
+                "stacked": "none",
+                "terms_field": "api_id.keyword",
+                "split_color_mode": "gradient",
+                "label": "Anomaly Score"
+            }
+        ],
+        "time_field": "@timestamp",
+        "index_pattern": ".ml-anomalies-*",
+        "interval": "auto",
+        "axis_position": "left",
+        "axis_formatter": "number",
+        "show_legend": 1,
+        "show_grid": 1
+    },
+    "aggs": []
+}).decode()
+
+# Dashboard panel layout, serialized once; __JOB_ID__ is replaced per job
+PANELS_JSON_TEMPLATE = orjson.dumps([
+    {
+        "panelIndex": "1",
+        "gridData": {
+            "x": 0,
+            "y": 0,
+            "w": 24,
+            "h": 15,
+            "i": "1"
+        },
+        "id": "api-anomalies-viz-__JOB_ID__",
+        "type": "visualization",
+        "version": "7.10.0"
+    }
+]).decode()
+
+@functools.lru_cache(maxsize=64)
+def _cached_get(url):
+    """GET an idempotent Kibana endpoint once per process, returning (status_code, text)"""
+    response = SESSION.get(url, verify=True, timeout=HTTP_TIMEOUT)
+    return response.status_code, response.text
+
+def _find_existing_connector(name):
+    """Return the ID of an existing connector with the given name, if any"""
+    status_code, text = _cached_get(f"{KIBANA_HOST}/api/actions/connectors")
+    if status_code != 200:
+        return None
+    for connector in json.loads(text):
+        if connector.get("name") == name:
+            return connector.get("id")
+    return None
+
+def _find_existing_rule(name, job_id):
+    """Return the ID of an existing ML rule with the given name for the job, if any"""
+    query = urllib.parse.urlencode({"search_fields": "name", "search": name})
+    status_code, text = _cached_get(f"{KIBANA_HOST}/api/alerting/rules/_find?{query}")
+    if status_code != 200:
+        return None
+    for rule in json.loads(text).get("data", []):
+        if rule.get("name") == name and rule.get("params", {}).get("machineLearningJob") == job_id:
+            return rule.get("id")
+    return None
 
 def test_connection():
     """Test connection to Kibana"""
     print("Testing connection to Kibana...")
     try:
-        response = requests.get(
-            f"{KIBANA_HOST}/api/status",
-            headers=auth_header,
-            verify=True
-        )
-        if response.status_code == 200:
+        status_code, text = _cached_get(f"{KIBANA_HOST}/api/status")
+        if status_code == 200:
             print("Successfully connected to Kibana!")
             return True
         else:
-            print(f"Failed to connect to Kibana. Status code: {response.status_code}")
-            print(f"Response: {response.text}")
+            print(f"Failed to connect to Kibana. Status code: {status_code}")
+            print(f"Response: {text}")
             return False
+    except requests.exceptions.ReadTimeout:
+        print(f"Kibana did not respond within {HTTP_TIMEOUT[1]} seconds.")
+        return False
     except Exception as e:
         print(f"Error connecting to Kibana: {e}")
         return False
@@ -75,15 +233,23 @@ def create_connector(connector_type, connector_name, connector_config):
     
     # Create connector via API
     try:
-        response = requests.post(
+        # Reuse a connector of the same name from an earlier run
+        existing_id = _find_existing_connector(connector_name)
+        if existing_id:
+            print(f"Using existing {connector_type} connector '{connector_name}'")
+            return existing_id
+        
+        response = SESSION.post(
             f"{KIBANA_HOST}/api/actions/connector",
-            headers={**auth_header, 'kbn-xsrf': 'true', 'Content-Type': 'application/json'},
             json=connector_payload,
-            verify=True
+            verify=True,
+            timeout=HTTP_TIMEOUT
         )
         
         if response.status_code in [200, 201]:
             print(f"Successfully created {connector_type} connector!")
+            # The cached connector list no longer reflects Kibana
+            _cached_get.cache_clear()
             return response.json().get('id')
         else:
             print(f"Failed to create connector. Status code: {response.status_code}")
@@ -101,40 +267,33 @@ def create_ml_anomaly_rule(job_id, connector_id, rule_name="API Anomaly Alert"):
         print("Cannot create rule: No connector ID provided")
         return None
     
-    # Define rule payload
+    # Define rule payload from the shared template
     rule_payload = {
+        **ML_RULE_TEMPLATE,
         "name": rule_name,
-        "tags": ["api", "monitoring", "anomaly"],
-        "params": {
-            "machineLearningJob": job_id,
-            "anomalyScoreThreshold": 75  # Alert when anomaly score is above 75
-        },
-        "consumer": "alerts",
-        "schedule": { "interval": "5m" },  # Check every 5 minutes
-        "actions": [
-            {
-                "group": "threshold_met",
-                "id": connector_id,
-                "params": {
-                    "message": "API Anomaly Detected: {{context.description}}. Score: {{context.anomaly_score}}. API: {{context.api_id}} in {{context.environment}}",
-                }
-            }
-        ],
-        "notify_when": "onActionGroupChange",
-        "rule_type_id": ".ml"
+        "params": {**ML_RULE_TEMPLATE["params"], "machineLearningJob": job_id},
+        "actions": [{**ML_RULE_ACTION_TEMPLATE, "id": connector_id}]
     }
     
     # Create rule via API
     try:
-        response = requests.post(
+        # Reuse a rule of the same name for this job from an earlier run
+        existing_id = _find_existing_rule(rule_name, job_id)
+        if existing_id:
+            print(f"Using existing ML anomaly rule '{rule_name}'")
+            return existing_id
+        
+        response = SESSION.post(
             f"{KIBANA_HOST}/api/alerting/rule",
-            headers={**auth_header, 'kbn-xsrf': 'true', 'Content-Type': 'application/json'},
             json=rule_payload,
-            verify=True
+            verify=True,
+            timeout=HTTP_TIMEOUT
         )
         
         if response.status_code in [200, 201]:
             print(f"Successfully created ML anomaly rule!")
+            # The cached rule search no longer reflects Kibana
+            _cached_get.cache_clear()
             return response.json().get('id')
         else:
             print(f"Failed to create rule. Status code: {response.status_code}")
@@ -155,52 +314,12 @@ def create_ndjson_export_file(job_id):
     visualization = {
         "attributes": {
             "title": "API Anomalies Overview",
-            "visState": json.dumps({
-                "title": "API Anomalies Overview",
-                "type": "metrics",
-                "params": {
-                    "id": "61ca57f0-469d-11e7-af02-69e470af7417",
-                    "type": "timeseries",
-                    "series": [
-                        {
-                            "id": "anomaly-score",
-                            "color": "#68BC00",
-                            "split_mode": "terms",
-                            "metrics": [
-                                {
-                                    "id": "1",
-                                    "type": "max",
-                                    "field": "anomaly_score"
-                                }
-                            ],
-                            "seperate_axis": 0,
-                            "axis_position": "right",
-                            "formatter": "number",
-                            "chart_type": "line",
-                            "line_width": 1,
-                            "point_size": 1,
-                            "fill": 0.5,
-                            "stacked": "none",
-                            "terms_field": "api_id.keyword",
-                            "split_color_mode": "gradient",
-                            "label": "Anomaly Score"
-                        }
-                    ],
-                    "time_field": "@timestamp",
-                    "index_pattern": ".ml-anomalies-*",
-                    "interval": "auto",
-                    "axis_position": "left",
-                    "axis_formatter": "number",
-                    "show_legend": 1,
-                    "show_grid": 1
-                },
-                "aggs": []
-            }),
+            "visState": VIS_STATE_JSON,
             "uiStateJSON": "{}",
             "description": "Shows anomaly scores for API monitoring",
             "version": 1,
             "kibanaSavedObjectMeta": {
-                "searchSourceJSON": "{\"query\":{\"query\":\"\",\"language\":\"kuery\"},\"filter\":[]}"
+                "searchSourceJSON": SEARCH_SOURCE_JSON
             }
         },
         "type": "visualization",
@@ -213,21 +332,7 @@ def create_ndjson_export_file(job_id):
             "title": "API Anomalies Dashboard",
             "hits": 0,
             "description": "Dashboard for monitoring API anomalies",
-            "panelsJSON": json.dumps([
-                {
-                    "panelIndex": "1",
-                    "gridData": {
-                        "x": 0,
-                        "y": 0,
-                        "w": 24,
-                        "h": 15,
-                        "i": "1"
-                    },
-                    "id": f"api-anomalies-viz-{job_id}",
-                    "type": "visualization",
-                    "version": "7.10.0"
-                }
-            ]),
+            "panelsJSON": PANELS_JSON_TEMPLATE.replace("__JOB_ID__", job_id),
             "optionsJSON": "{\"hidePanelTitles\":false,\"useMargins\":true}",
             "version": 1,
             "timeRestore": True,
@@ -238,7 +343,7 @@ def create_ndjson_export_file(job_id):
                 "value": 60000
             },
             "kibanaSavedObjectMeta": {
-                "searchSourceJSON": "{\"query\":{\"query\":\"\",\"language\":\"kuery\"},\"filter\":[]}"
+                "searchSourceJSON": SEARCH_SOURCE_JSON
             }
         },
         "type": "dashboard",
@@ -246,13 +351,13 @@ def create_ndjson_export_file(job_id):
     }
     
     # Create NDJSON content - each JSON object on a new line without commas
-    ndjson_content = f"{json.dumps(visualization)}\n{json.dumps(dashboard)}"
+    ndjson_content = orjson.dumps(visualization) + b"\n" + orjson.dumps(dashboard)
     
     # Save to file with .ndjson extension (the correct format for Kibana imports)
     os.makedirs("kibana_imports", exist_ok=True)
     file_path = f"kibana_imports/api_monitoring_objects.ndjson"
     
-    with open(file_path, 'w') as f:
+    with open(file_path, 'wb') as f:
         f.write(ndjson_content)
     
     print(f"NDJSON export file created at {file_path}")
@@ -260,8 +365,33 @@ def create_ndjson_export_file(job_id):
     
     return file_path
 
+def prompt_if_missing(value, prompt):
+    """Return a command line value, prompting for it only on an interactive terminal"""
+    if value:
+        return value
+    if sys.stdin.isatty():
+        return input(prompt)
+    return ""
+
+def parse_args():
+    """Parse command line arguments; anything omitted is prompted for interactively"""
+    parser = argparse.ArgumentParser(description="Create Kibana connectors, rules and saved objects for API monitoring")
+    parser.add_argument("--job-id", help="ML job ID to alert on and visualize")
+    parser.add_argument("--connector-type", choices=["slack", "email", "existing", "none"],
+                        help="Connector to create, or 'existing' to use --connector-id")
+    parser.add_argument("--connector-id", help="ID of an existing connector")
+    parser.add_argument("--webhook-url", help="Slack webhook URL")
+    parser.add_argument("--email-from", help="'from' address of the email connector")
+    parser.add_argument("--smtp-host", help="SMTP host of the email connector")
+    parser.add_argument("--smtp-user", help="SMTP username of the email connector")
+    parser.add_argument("--smtp-password", default=os.getenv("SMTP_PASSWORD"),
+                        help="SMTP password of the email connector (default: $SMTP_PASSWORD)")
+    return parser.parse_args()
+
 def main():
     """Main execution flow"""
+    args = parse_args()
+    
     print("=== Kibana Objects Creator ===")
     
     # Test connection
@@ -270,28 +400,38 @@ def main():
         return
     
     # Get ML job ID
-    job_id = input("Enter your ML job ID (e.g., api_performance_anomalies): ")
+    job_id = prompt_if_missing(args.job_id, "Enter your ML job ID (e.g., api_performance_anomalies): ")
     if not job_id:
         print("No job ID provided. Exiting.")
         return
     
-    # Create connector
-    print("\nConnector Creation")
-    print("1. Create a Slack connector")
-    print("2. Create an Email connector")
-    print("3. Skip connector creation (if you already have one)")
+    # The NDJSON export only depends on the job ID, so write it in the
+    # background while the connector and rule are provisioned
+    export_executor = ThreadPoolExecutor(max_workers=1)
+    ndjson_future = export_executor.submit(create_ndjson_export_file, job_id)
     
-    connector_choice = input("\nEnter your choice (1-3): ")
+    # Create connector
+    connector_type = args.connector_type or ("existing" if args.connector_id else None)
+    if not connector_type and sys.stdin.isatty():
+        print("\nConnector Creation")
+        print("1. Create a Slack connector")
+        print("2. Create an Email connector")
+        print("3. Skip connector creation (if you already have one)")
+        
+        connector_choice = input("\nEnter your choice (1-3): ")
+        connector_type = {"1": "slack", "2": "email", "3": "existing"}.get(connector_choice)
+        if not connector_type:
+            print("Invalid choice. Skipping connector creation.")
     
     connector_id = None
-    if connector_choice == "1":
-        webhook_url = input("Enter Slack webhook URL: ")
+    if connector_type == "slack":
+        webhook_url = prompt_if_missing(args.webhook_url, "Enter Slack webhook URL: ")
         connector_id = create_connector("slack", "API Monitoring Slack", {"webhook_url": webhook_url})
-    elif connector_choice == "2":
-        email = input("Enter 'from' email address: ")
-        smtp_host = input("Enter SMTP host: ")
-        smtp_user = input("Enter SMTP username: ")
-        smtp_pass = input("Enter SMTP password: ")
+    elif connector_type == "email":
+        email = prompt_if_missing(args.email_from, "Enter 'from' email address: ")
+        smtp_host = prompt_if_missing(args.smtp_host, "Enter SMTP host: ")
+        smtp_user = prompt_if_missing(args.smtp_user, "Enter SMTP username: ")
+        smtp_pass = prompt_if_missing(args.smtp_password, "Enter SMTP password: ")
         
         connector_id = create_connector("email", "API Monitoring Email", {
             "from": email,
@@ -299,10 +439,8 @@ def main():
             "user": smtp_user,
             "password": smtp_pass
         })
-    elif connector_choice == "3":
-        connector_id = input("Enter your existing connector ID: ")
-    else:
-        print("Invalid choice. Skipping connector creation.")
+    elif connector_type == "existing":
+        connector_id = prompt_if_missing(args.connector_id, "Enter your existing connector ID: ")
     
     # Create alert rule if we have a connector
     if connector_id:
@@ -312,8 +450,9 @@ def main():
     else:
         print("Skipping rule creation since no connector ID is available.")
     
-    # Create NDJSON export file for dashboards and visualizations
-    ndjson_file = create_ndjson_export_file(job_id)
+    # Wait for the NDJSON export file for dashboards and visualizations
+    ndjson_file = ndjson_future.result()
+    export_executor.shutdown()
     
     print("\n=== Setup Summary ===")
     print(f"ML Job ID: {job_id}")
@@ -328,6 +467,8 @@ def main():
     print("   Go to Stack Management > Saved Objects > Import")
     print("   Select the file: " + ndjson_file)
     print("\n2. To test your setup, run the trigger_anomaly.py script to inject anomalous data.")
+    
+    _cached_get.cache_clear()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,9 +5,11 @@ This script creates an ML job in Elasticsearch for API anomaly detection.
 It focuses specifically on setting up the ML job correctly.
 """
 import os
+import sys
+import argparse
 import json
-import time
-from elasticsearch import Elasticsearch
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch import Elasticsearch, ConflictError, NotFoundError
 
 # Configuration parameters (from environment or defaults)
 ELASTICSEARCH_CLOUD_ID = os.getenv("ELASTICSEARCH_CLOUD_ID", 
@@ -21,7 +23,15 @@ def connect_to_elasticsearch():
     try:
         es = Elasticsearch(
             cloud_id=ELASTICSEARCH_CLOUD_ID,
-            basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD)
+            basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD),
+            # Retry throttled/unavailable responses with the client's backoff;
+            # like the Kibana policy, not 502/504, where a PUT may have applied
+            retry_on_status=(429, 503),
+            retry_on_timeout=True,
+            max_retries=5,
+            # Enough pooled connections for the concurrent job creation
+            connections_per_node=10,
+            request_timeout=30
         )
         
         # Test connection
@@ -32,13 +42,49 @@ def connect_to_elasticsearch():
         print(f"Failed to connect to Elasticsearch: {e}")
         return None
 
+def job_exists(es, job_id):
+    """Check whether an ML job with the given ID already exists"""
+    try:
+        es.ml.get_jobs(job_id=job_id)
+        return True
+    except NotFoundError:
+        return False
+
+def datafeed_exists(es, datafeed_id):
+    """Check whether a datafeed with the given ID already exists"""
+    try:
+        es.ml.get_datafeeds(datafeed_id=datafeed_id)
+        return True
+    except NotFoundError:
+        return False
+
+def open_job(es, job_id):
+    """Open a job, treating a job that is already open as success"""
+    try:
+        es.ml.open_job(job_id=job_id)
+        print(f"Opened job: {job_id}")
+    except ConflictError:
+        print(f"Job already opened: {job_id}")
+
+def put_datafeed_and_open_job(es, job_id, datafeed_id, datafeed_config):
+    """Create the job's datafeed if it is missing and open the job"""
+    # Both calls only need the job to exist, so the job is opened (fix for
+    # the closed job issue) while the datafeed is being created
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        open_future = executor.submit(open_job, es, job_id)
+        
+        # An earlier run may have created the job but failed on its datafeed
+        if datafeed_exists(es, datafeed_id):
+            print(f"Datafeed already exists: {datafeed_id}")
+        else:
+            es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
+            print(f"Datafeed created: {datafeed_id}")
+        
+        open_future.result()
+
 def create_response_time_job(es, job_id="api_response_time_anomalies"):
     """Create a job to detect response time anomalies"""
-    # Generate unique job ID to avoid conflicts with existing jobs
-    timestamp = int(time.time())
-    unique_job_id = f"{job_id}-{timestamp}"
-    
-    print(f"Creating response time anomaly detection job: {unique_job_id}")
+    print(f"Creating response time anomaly detection job: {job_id}")
     
     job_config = {
         "description": "Detects anomalies in API response times across environments",
@@ -75,33 +121,32 @@ def create_response_time_job(es, job_id="api_response_time_anomalies"):
     }
     
     try:
-        # Create the job with a unique ID
-        response = es.ml.put_job(job_id=unique_job_id, body=job_config)
-        print(f"Job created successfully: {response['job_id']}")
+        # Reuse the job if an earlier run already created it; its datafeed
+        # and open state are still checked below
+        if job_exists(es, job_id):
+            print(f"Job already exists, skipping creation: {job_id}")
+        else:
+            response = es.ml.put_job(job_id=job_id, body=job_config)
+            print(f"Job created successfully: {response['job_id']}")
         
         # Create a datafeed
-        datafeed_id = f"{unique_job_id}-datafeed"
+        datafeed_id = f"{job_id}-datafeed"
         datafeed_config = {
-            "job_id": unique_job_id,
+            "job_id": job_id,
             "indices": ["api_metrics*"],
             "query": {"match_all": {}}
         }
         
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Datafeed created: {datafeed_id}")
+        put_datafeed_and_open_job(es, job_id, datafeed_id, datafeed_config)
         
-        return unique_job_id
+        return job_id
     except Exception as e:
         print(f"Error creating response time job: {e}")
         return None
 
 def create_error_rate_job(es, job_id="api_error_rate_anomalies"):
     """Create a job to detect error rate anomalies"""
-    # Generate unique job ID to avoid conflicts with existing jobs
-    timestamp = int(time.time())
-    unique_job_id = f"{job_id}-{timestamp}"
-    
-    print(f"Creating error rate anomaly detection job: {unique_job_id}")
+    print(f"Creating error rate anomaly detection job: {job_id}")
     
     job_config = {
         "description": "Monitors API error rates across environments",
@@ -132,14 +177,18 @@ def create_error_rate_job(es, job_id="api_error_rate_anomalies"):
     }
     
     try:
-        # Create the job with a unique ID
-        response = es.ml.put_job(job_id=unique_job_id, body=job_config)
-        print(f"Job created successfully: {response['job_id']}")
+        # Reuse the job if an earlier run already created it; its datafeed
+        # and open state are still checked below
+        if job_exists(es, job_id):
+            print(f"Job already exists, skipping creation: {job_id}")
+        else:
+            response = es.ml.put_job(job_id=job_id, body=job_config)
+            print(f"Job created successfully: {response['job_id']}")
         
         # Create a datafeed
-        datafeed_id = f"{unique_job_id}-datafeed"
+        datafeed_id = f"{job_id}-datafeed"
         datafeed_config = {
-            "job_id": unique_job_id,
+            "job_id": job_id,
             "indices": ["api_metrics*"],
             "query": {
                 "bool": {
@@ -150,21 +199,16 @@ def create_error_rate_job(es, job_id="api_error_rate_anomalies"):
             }
         }
         
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Datafeed created: {datafeed_id}")
+        put_datafeed_and_open_job(es, job_id, datafeed_id, datafeed_config)
         
-        return unique_job_id
+        return job_id
     except Exception as e:
         print(f"Error creating error rate job: {e}")
         return None
 
 def create_cross_environment_job(es, job_id="cross_environment_anomalies"):
     """Create a job to correlate patterns across environments"""
-    # Generate unique job ID to avoid conflicts with existing jobs
-    timestamp = int(time.time())
-    unique_job_id = f"{job_id}-{timestamp}"
-    
-    print(f"Creating cross-environment correlation job: {unique_job_id}")
+    print(f"Creating cross-environment correlation job: {job_id}")
     
     job_config = {
         "description": "Correlates patterns across environments to detect cross-environment issues",
@@ -190,34 +234,39 @@ def create_cross_environment_job(es, job_id="cross_environment_anomalies"):
     }
     
     try:
-        # Create the job with the unique ID
-        response = es.ml.put_job(job_id=unique_job_id, body=job_config)
-        print(f"Job created successfully: {response['job_id']}")
+        # Reuse the job if an earlier run already created it; its datafeed
+        # and open state are still checked below
+        if job_exists(es, job_id):
+            print(f"Job already exists, skipping creation: {job_id}")
+        else:
+            response = es.ml.put_job(job_id=job_id, body=job_config)
+            print(f"Job created successfully: {response['job_id']}")
         
         # Create a datafeed
-        datafeed_id = f"{unique_job_id}-datafeed"
+        datafeed_id = f"{job_id}-datafeed"
         datafeed_config = {
-            "job_id": unique_job_id,
+            "job_id": job_id,
             "indices": ["api_metrics*"],
             "query": {"match_all": {}}
         }
         
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Datafeed created: {datafeed_id}")
+        put_datafeed_and_open_job(es, job_id, datafeed_id, datafeed_config)
         
-        return unique_job_id
+        return job_id
     except Exception as e:
         print(f"Error creating cross-environment job: {e}")
         return None
 
 def start_job_datafeed(es, job_id):
-    """Start the datafeed for a job"""
+    """Start the datafeed for a job opened by put_datafeed_and_open_job"""
     datafeed_id = f"{job_id}-datafeed"
     
     try:
-        # First open the job (fix for the closed job issue)
-        es.ml.open_job(job_id=job_id)
-        print(f"Opened job: {job_id}")
+        # A datafeed left running by an earlier run needs no restart
+        stats = es.ml.get_datafeed_stats(datafeed_id=datafeed_id)
+        if stats["datafeeds"] and stats["datafeeds"][0]["state"] == "started":
+            print(f"Datafeed already started: {datafeed_id}")
+            return True
         
         # Start the datafeed
         es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
@@ -227,7 +276,54 @@ def start_job_datafeed(es, job_id):
         print(f"Error starting datafeed: {e}")
         return False
 
+def provision_job(es, create_job):
+    """Create a job with the given creator function and start its datafeed"""
+    try:
+        job_id = create_job(es)
+    except Exception as e:
+        print(f"Error creating job with {create_job.__name__}: {e}")
+        return None
+    if job_id:
+        start_job_datafeed(es, job_id)
+    return job_id
+
+# Job types selectable with --jobs, mapped to the functions creating them
+JOB_CREATORS = {
+    "response": create_response_time_job,
+    "error": create_error_rate_job,
+    "cross": create_cross_environment_job
+}
+
+# Interactive menu choices mapped to the job types they create
+MENU_CHOICES = {
+    "1": ["response"],
+    "2": ["error"],
+    "3": ["cross"],
+    "4": list(JOB_CREATORS)
+}
+
+def parse_job_types(value):
+    """Parse a comma-separated --jobs value into a list of job types"""
+    job_types = list(JOB_CREATORS) if value == "all" else [t.strip() for t in value.split(",") if t.strip()]
+    unknown = [job_type for job_type in job_types if job_type not in JOB_CREATORS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown job type(s): {', '.join(unknown)}")
+    return job_types
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Create ML jobs for API anomaly detection")
+    parser.add_argument(
+        "--jobs",
+        type=parse_job_types,
+        help="Comma-separated job types to create (response,error,cross) or 'all'. "
+             "Prompts for a choice when omitted on an interactive terminal."
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("=== Machine Learning Job Creator for API Monitoring ===\n")
     
     # Connect to Elasticsearch
@@ -239,33 +335,30 @@ def main():
     # Create directories for storing job configurations
     os.makedirs("jobs", exist_ok=True)
     
-    print("\nSelect ML job type to create:")
-    print("1. Response Time Anomaly Detection")
-    print("2. Error Rate Anomaly Detection")
-    print("3. Cross-Environment Correlation")
-    print("4. Create All Jobs (recommended for full monitoring)")
+    if args.jobs:
+        job_types = args.jobs
+    elif sys.stdin.isatty():
+        print("\nSelect ML job type to create:")
+        print("1. Response Time Anomaly Detection")
+        print("2. Error Rate Anomaly Detection")
+        print("3. Cross-Environment Correlation")
+        print("4. Create All Jobs (recommended for full monitoring)")
+        
+        choice = input("\nEnter your choice (1-4): ")
+        job_types = MENU_CHOICES.get(choice, [])
+    else:
+        print("\nNo job types selected. Pass --jobs when running non-interactively.")
+        job_types = []
     
-    choice = input("\nEnter your choice (1-4): ")
+    job_creators = [JOB_CREATORS[job_type] for job_type in job_types]
     
+    # The jobs are independent of each other, so they are created and
+    # started concurrently over the shared client
     created_jobs = []
-    
-    if choice == "1" or choice == "4":
-        job_id = create_response_time_job(es)
-        if job_id:
-            created_jobs.append(job_id)
-            start_job_datafeed(es, job_id)
-    
-    if choice == "2" or choice == "4":
-        job_id = create_error_rate_job(es)
-        if job_id:
-            created_jobs.append(job_id)
-            start_job_datafeed(es, job_id)
-    
-    if choice == "3" or choice == "4":
-        job_id = create_cross_environment_job(es)
-        if job_id:
-            created_jobs.append(job_id)
-            start_job_datafeed(es, job_id)
+    if job_creators:
+        with ThreadPoolExecutor(max_workers=len(job_creators)) as executor:
+            futures = [executor.submit(provision_job, es, create_job) for create_job in job_creators]
+            created_jobs = [job_id for job_id in (future.result() for future in futures) if job_id]
     
     if created_jobs:
         print("\n=== Created Jobs Summary ===")
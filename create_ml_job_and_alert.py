@@ -8,41 +8,92 @@ This script:
 4. Configures a notification connector (placeholder for you to customize)
 """
 import os
-import json
+import sys
+import argparse
 import urllib.parse
-import time
-from elasticsearch import Elasticsearch
-import requests
-from datetime import datetime, timedelta
+import orjson
+from es_client import get_client
+from ml_bootstrap import bulk_put_ml_jobs, bulk_put_datafeeds, bulk_start_datafeeds, report_results
 
 # Configuration parameters (normally would be in .env)
-ELASTICSEARCH_CLOUD_ID = os.getenv("ELASTICSEARCH_CLOUD_ID", 
-                                  "ai-agent-monitoring:dXMtZWFzdC0yLmF3cy5lbGFzdGljLWNsb3VkLmNvbSRhYTE2ODUyNDVhODM0NzM3YTFjZTFhMmU0ZWFlN2Y1MCQyYmU1YWExYzQxOTg0NDFhOTI1YzQ2MDMxZjI0Nzc0Mg==")
-ELASTICSEARCH_USERNAME = os.getenv("ELASTICSEARCH_USERNAME", "elastic")
-ELASTICSEARCH_PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "KIuc03ZYAf6IqGkE1zEap1DR")
 KIBANA_BASE_URL = os.getenv("KIBANA_BASE_URL", "https://ai-agent-monitoring.kb.us-east-2.aws.elastic-cloud.com")
 
-# Create directories for storing configurations
-os.makedirs("jobs", exist_ok=True)
-os.makedirs("alerts", exist_ok=True)
+# Kibana URLs; {job_id} in the templates is the URL-encoded job ID
+ML_JOB_URL_TEMPLATE = f"{KIBANA_BASE_URL}/app/ml#/jobs/single_metric/{{job_id}}"
+ANOMALY_EXPLORER_URL_TEMPLATE = f"{KIBANA_BASE_URL}/app/ml#/explorer?_g=(ml:(jobIds:!('{{job_id}}')))"
+ALERT_RULES_URL = f"{KIBANA_BASE_URL}/app/management/insightsAndAlerting/triggersActions/alerts"
+CONNECTORS_URL = f"{KIBANA_BASE_URL}/app/management/insightsAndAlerting/triggersActions/connectors"
 
-# Connect to Elasticsearch
-print("Connecting to Elasticsearch...")
-try:
-    es = Elasticsearch(
-        cloud_id=ELASTICSEARCH_CLOUD_ID,
-        basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD)
-    )
+# Anomaly visualization state, serialized once; Kibana stores visState as a JSON string
+ANOMALY_VIS_STATE_JSON = orjson.dumps({
+    "title": "API Anomalies Overview",
+    "type": "metrics",
+    "params": {
+        "id": "61ca57f0-469d-11e7-af02-69e470af7417",
+        "type": "timeseries",
+        "series": [
+            {
+                "id": "anomaly-score",
+                "color": "#68BC00",
+                "split_mode": "terms",
+                "metrics": [
+                    {
+                        "id": "1",
+                        "type": "max",
+                        "field": "anomaly_score"
+                    }
+                ],
+                "seperate_axis": 0,
+                "axis_position": "right",
+                "formatter": "number",
+                "chart_type": "line",
+                "line_width": 1,
+                "point_size": 1,
+                "fill": 0.5,
+                "stacked": "none",
+                "terms_field": "api_id.keyword",
+                "split_color_mode": "gradient",
+                "label": "Anomaly Score"
+            }
+        ],
+        "time_field": "@timestamp",
+        "index_pattern": "ml_anomalies*",
+        "interval": "auto",
+        "axis_position": "left",
+        "axis_formatter": "number",
+        "show_legend": 1,
+        "show_grid": 1
+    },
+    "aggs": []
+}).decode()
+
+def _ensure_dir(path):
+    """Create the directory holding a config file if it doesn't exist"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+def write_if_changed(path, config):
+    """Write a config as indented JSON, skipping the write if the file is already up to date"""
+    _ensure_dir(path)
+    data = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
     
-    # Test connection
-    info = es.info()
-    print(f"Successfully connected to Elasticsearch cluster: {info['cluster_name']}")
-except Exception as e:
-    print(f"Failed to connect to Elasticsearch: {e}")
-    exit(1)
+    # Write to a temporary file first so the config is replaced atomically
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def create_ml_job(dry_run=False):
+    """Create a machine learning job for API anomaly detection
 
-def create_ml_job():
-    """Create a machine learning job for API anomaly detection"""
+    With dry_run the job config is only written to disk.
+    """
     print("Creating ML job for API anomaly detection...")
     
     # Define the ML job
@@ -81,37 +132,40 @@ def create_ml_job():
     }
     
     # Save job config to file
-    with open('jobs/api_performance_anomalies.json', 'w') as f:
-        json.dump(api_anomaly_job, f, indent=2)
+    write_if_changed('jobs/api_performance_anomalies.json', api_anomaly_job)
+    if dry_run:
+        return api_anomaly_job["job_id"]
     
     # Create the job in Elasticsearch
-    try:
-        # Create the ML job
-        es.ml.put_job(job_id=api_anomaly_job["job_id"], body=api_anomaly_job)
-        print(f"Created job: {api_anomaly_job['job_id']}")
-        
-        # Create a datafeed for the job
-        datafeed_id = f"{api_anomaly_job['job_id']}-datafeed"
-        datafeed_config = {
-            "job_id": api_anomaly_job["job_id"],
+    es = get_client()
+    job_id = api_anomaly_job["job_id"]
+    if report_results("Created job", bulk_put_ml_jobs(es, [api_anomaly_job])):
+        return None
+    
+    # Create a datafeed for the job
+    datafeed_id = f"{job_id}-datafeed"
+    feeds = {
+        datafeed_id: {
+            "job_id": job_id,
             "indices": ["api_metrics*"],
-            "query": {"match_all": {}}
+            # Filter context is cacheable across scheduled searches and drops
+            # documents without the metric early
+            "query": {"bool": {"filter": [{"exists": {"field": "response_time_ms"}}]}},
+            # Fewer, larger searches during the 7-day backfill; switch chunking
+            # to manual with a 3h time_span if the datafeed gains aggregations
+            "scroll_size": 10000,
+            "chunking_config": {"mode": "auto"},
+            "query_delay": "90s"
         }
-        
-        es.ml.put_datafeed(datafeed_id=datafeed_id, body=datafeed_config)
-        print(f"Created datafeed: {datafeed_id}")
-        
-        # Start the datafeed
-        try:
-            es.ml.start_datafeed(datafeed_id=datafeed_id, start="now-7d")
-            print(f"Started datafeed: {datafeed_id}")
-        except Exception as e:
-            print(f"Note: Could not start datafeed. You may need to manually start it: {e}")
-        
-        return api_anomaly_job["job_id"]
-    except Exception as e:
-        print(f"Error creating ML job: {e}")
+    }
+    if report_results("Created datafeed", bulk_put_datafeeds(es, feeds)):
         return None
+    
+    # Open the job and start the datafeed
+    if report_results("Started datafeed", bulk_start_datafeeds(es, feeds)):
+        print("Note: Could not start datafeed. You may need to manually start it.")
+    
+    return job_id
 
 def create_connector_config():
     """
@@ -147,12 +201,9 @@ def create_connector_config():
     }
     
     # Save connector configs
-    os.makedirs("connectors", exist_ok=True)
-    with open('connectors/slack_connector.json', 'w') as f:
-        json.dump(slack_connector, f, indent=2)
+    write_if_changed('connectors/slack_connector.json', slack_connector)
     
-    with open('connectors/email_connector.json', 'w') as f:
-        json.dump(email_connector, f, indent=2)
+    write_if_changed('connectors/email_connector.json', email_connector)
     
     print("Created connector configurations in 'connectors' directory")
     print("Use these configurations to create connectors in Kibana UI")
@@ -194,8 +245,7 @@ def create_alert_rule_config(job_id):
     }
     
     # Save alert rule config
-    with open('alerts/api_anomaly_alert.json', 'w') as f:
-        json.dump(ml_alert_rule, f, indent=2)
+    write_if_changed('alerts/api_anomaly_alert.json', ml_alert_rule)
     
     print("Created alert rule configuration in 'alerts/api_anomaly_alert.json'")
     print("Follow these steps to create the alert in Kibana:")
@@ -214,18 +264,12 @@ def provide_kibana_urls(job_id):
     # URL encode the job ID
     encoded_job_id = urllib.parse.quote(job_id)
     
-    # ML job URL
-    ml_job_url = f"{KIBANA_BASE_URL}/app/ml#/jobs/single_metric/{encoded_job_id}"
-    
-    # Anomaly Explorer URL
-    anomaly_explorer_url = f"{KIBANA_BASE_URL}/app/ml#/explorer?_g=(ml:(jobIds:!('{encoded_job_id}')))"
-    
     # Print URLs
     print("\n==== URLs for ML Job and Alerts ====")
-    print(f"1. ML Job Overview: {ml_job_url}")
-    print(f"2. Anomaly Explorer: {anomaly_explorer_url}")
-    print(f"3. Alert Rules: {KIBANA_BASE_URL}/app/management/insightsAndAlerting/triggersActions/alerts")
-    print(f"4. Connectors: {KIBANA_BASE_URL}/app/management/insightsAndAlerting/triggersActions/connectors")
+    print(f"1. ML Job Overview: {ML_JOB_URL_TEMPLATE.format(job_id=encoded_job_id)}")
+    print(f"2. Anomaly Explorer: {ANOMALY_EXPLORER_URL_TEMPLATE.format(job_id=encoded_job_id)}")
+    print(f"3. Alert Rules: {ALERT_RULES_URL}")
+    print(f"4. Connectors: {CONNECTORS_URL}")
 
 def create_sample_visualization():
     """Create a sample Kibana visualization configuration file for ML results"""
@@ -233,47 +277,7 @@ def create_sample_visualization():
     anomaly_viz = {
         "attributes": {
             "title": "API Anomalies Overview",
-            "visState": json.dumps({
-                "title": "API Anomalies Overview",
-                "type": "metrics",
-                "params": {
-                    "id": "61ca57f0-469d-11e7-af02-69e470af7417",
-                    "type": "timeseries",
-                    "series": [
-                        {
-                            "id": "anomaly-score",
-                            "color": "#68BC00",
-                            "split_mode": "terms",
-                            "metrics": [
-                                {
-                                    "id": "1",
-                                    "type": "max",
-                                    "field": "anomaly_score"
-                                }
-                            ],
-                            "seperate_axis": 0,
-                            "axis_position": "right",
-                            "formatter": "number",
-                            "chart_type": "line",
-                            "line_width": 1,
-                            "point_size": 1,
-                            "fill": 0.5,
-                            "stacked": "none",
-                            "terms_field": "api_id.keyword",
-                            "split_color_mode": "gradient",
-                            "label": "Anomaly Score"
-                        }
-                    ],
-                    "time_field": "@timestamp",
-                    "index_pattern": "ml_anomalies*",
-                    "interval": "auto",
-                    "axis_position": "left",
-                    "axis_formatter": "number",
-                    "show_legend": 1,
-                    "show_grid": 1
-                },
-                "aggs": []
-            }),
+            "visState": ANOMALY_VIS_STATE_JSON,
             "uiStateJSON": "{}",
             "description": "Shows anomaly scores for API monitoring",
             "savedSearchId": "",
@@ -282,9 +286,7 @@ def create_sample_visualization():
     }
     
     # Save visualization config
-    os.makedirs("visualizations", exist_ok=True)
-    with open('visualizations/api_anomalies_viz.json', 'w') as f:
-        json.dump(anomaly_viz, f, indent=2)
+    write_if_changed('visualizations/api_anomalies_viz.json', anomaly_viz)
     
     print("Created visualization configuration in 'visualizations/api_anomalies_viz.json'")
     print("To import this visualization:")
@@ -292,10 +294,39 @@ def create_sample_visualization():
     print("2. Click Import")
     print("3. Select the 'visualizations/api_anomalies_viz.json' file")
 
+def verify_connection():
+    """Check that the cluster is reachable before creating anything"""
+    try:
+        info = get_client().info()
+        print(f"Successfully connected to Elasticsearch cluster: {info['cluster_name']}")
+        return True
+    except Exception as e:
+        print(f"Failed to connect to Elasticsearch: {e}")
+        return False
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Create the API anomaly ML job and alert configurations")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only write the JSON configuration files; don't contact Elasticsearch"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Check the Elasticsearch connection before creating the ML job"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.verify and not args.dry_run and not verify_connection():
+        sys.exit(1)
+    
     try:
         # Step 1: Create ML job
-        job_id = create_ml_job()
+        job_id = create_ml_job(dry_run=args.dry_run)
         
         # Step 2: Create connector configuration
         create_connector_config()
@@ -1,34 +1,40 @@
-from elasticsearch import Elasticsearch
-import json
+import orjson
 import urllib.parse
 import os
+import sys
+from elasticsearch import AuthenticationException, ConnectionError as ESConnectionError
+from es_client import get_client
+from ml_bootstrap import bulk_put_ml_jobs, bulk_put_datafeeds, bulk_start_datafeeds, report_results
 
-# Elasticsearch connection information from .env file
-cloud_id = "ai-agent-monitoring:dXMtZWFzdC0yLmF3cy5lbGFzdGljLWNsb3VkLmNvbSRhYTE2ODUyNDVhODM0NzM3YTFjZTFhMmU0ZWFlN2Y1MCQyYmU1YWExYzQxOTg0NDFhOTI1YzQ2MDMxZjI0Nzc0Mg=="
-username = "elastic"
-password = "KIuc03ZYAf6IqGkE1zEap1DR"
+# Kibana ML app URL and the Single Metric Viewer link template; {job_id} is the
+# URL-encoded job ID and the time range is similar to the screenshot (Mar-Apr 2020)
+KIBANA_ML_URL = "https://ai-agent-monitoring.kb.us-east-2.aws.elastic-cloud.com/app/ml"
+SINGLE_METRIC_URL_TEMPLATE = (
+    f"{KIBANA_ML_URL}#/timeseriesexplorer?_g=(ml:(jobIds:!('{{job_id}}')),time:(from:1584975600000,to:1587513540000))"
+    "&_a=(mlTimeSeriesExplorer:(detectorIndex:0,entities:(),zoom:(from:'2020-04-13T07:00:00.000Z',to:'2020-04-15T07:00:00.000Z')))"
+)
 
-print("Connecting to Elasticsearch...")
-try:
-    # Connect to Elasticsearch
-    es = Elasticsearch(
-        cloud_id=cloud_id,
-        basic_auth=(username, password)
+def single_metric_url():
+    """Return the Single Metric Viewer URL for the response time job"""
+    return SINGLE_METRIC_URL_TEMPLATE.format(job_id=urllib.parse.quote("api_response_time_anomalies"))
+
+def exit_on_connection_error(results):
+    """Print the fallback URL and exit if any request failed to reach the cluster"""
+    error = next(
+        (error for _, error in results if isinstance(error, (ESConnectionError, AuthenticationException))),
+        None
     )
-    
-    # Test connection
-    info = es.info()
-    print(f"Successfully connected to Elasticsearch cluster: {info['cluster_name']}")
-except Exception as e:
-    print(f"Failed to connect to Elasticsearch: {e}")
+    if error is None:
+        return
+    print(f"Failed to connect to Elasticsearch: {error}")
     print("Please check your credentials and network connection.")
     print("\nEven if we can't connect to Elasticsearch, here's the URL to view the visualization:")
-    base_url = "https://ai-agent-monitoring.kb.us-east-2.aws.elastic-cloud.com/app/ml"
-    job_id = urllib.parse.quote("api_response_time_anomalies")
-    time_range = "from:1584975600000,to:1587513540000"  # Similar to the screenshot (Mar-Apr 2020)
-    single_metric_url = f"{base_url}#/timeseriesexplorer?_g=(ml:(jobIds:!('{job_id}')),time:({time_range}))&_a=(mlTimeSeriesExplorer:(detectorIndex:0,entities:(),zoom:(from:'2020-04-13T07:00:00.000Z',to:'2020-04-15T07:00:00.000Z')))"
-    print(f"\n{single_metric_url}\n")
-    exit(1)
+    print(f"\n{single_metric_url()}\n")
+    sys.exit(1)
+
+# Shared Elasticsearch client; instead of probing the cluster up front,
+# connection problems are detected on the first provisioning request
+es = get_client()
 
 # Create directory for job configs if it doesn't exist
 os.makedirs("jobs", exist_ok=True)
@@ -106,41 +112,46 @@ error_rate_job = {
     }
 }
 
+def datafeed_config(job):
+    """Return the datafeed that feeds a job from the API metrics indices"""
+    # Only documents carrying the field of the job's first detector; a filter
+    # context is cached across the datafeed's scheduled searches
+    metric_field = job["analysis_config"]["detectors"][0]["field_name"]
+    return {
+        "job_id": job["job_id"],
+        "indices": ["api_metrics*"],
+        "query": {"bool": {"filter": [{"exists": {"field": metric_field}}]}},
+        # Fewer, larger searches during the 7-day backfill
+        "scroll_size": 10000,
+        "chunking_config": {"mode": "auto"},
+        "query_delay": "90s"
+    }
+
 # Save job configs as files
-with open('jobs/api_response_time.json', 'w') as f:
-    json.dump(response_time_job, f, indent=2)
+with open('jobs/api_response_time.json', 'wb') as f:
+    f.write(orjson.dumps(response_time_job, option=orjson.OPT_INDENT_2))
 
-with open('jobs/api_error_rate_analysis.json', 'w') as f:
-    json.dump(error_rate_job, f, indent=2)
+with open('jobs/api_error_rate_analysis.json', 'wb') as f:
+    f.write(orjson.dumps(error_rate_job, option=orjson.OPT_INDENT_2))
 
 try:
     # Create the jobs using the ML API
     print("Creating ML jobs...")
-    try:
-        # Try to create first job
-        es.ml.put_job(job_id=response_time_job["job_id"], body=response_time_job)
-        print(f"Created job: {response_time_job['job_id']}")
-    except Exception as e:
-        print(f"Error creating response time job: {e}")
     
-    try:
-        # Try to create second job
-        es.ml.put_job(job_id=error_rate_job["job_id"], body=error_rate_job)
-        print(f"Created job: {error_rate_job['job_id']}")
-    except Exception as e:
-        print(f"Error creating error rate job: {e}")
-
-    # Generate direct link to the Single Metric Viewer for the job
-    base_url = "https://ai-agent-monitoring.kb.us-east-2.aws.elastic-cloud.com/app/ml"
-    job_id = urllib.parse.quote(response_time_job["job_id"])
-    time_range = "from:1584975600000,to:1587513540000"  # Similar to the screenshot (Mar-Apr 2020)
-
-    # Direct link to Single Metric Viewer
-    single_metric_url = f"{base_url}#/timeseriesexplorer?_g=(ml:(jobIds:!('{job_id}')),time:({time_range}))&_a=(mlTimeSeriesExplorer:(detectorIndex:0,entities:(),zoom:(from:'2020-04-13T07:00:00.000Z',to:'2020-04-15T07:00:00.000Z')))"
+    # The jobs are independent, so each step runs for all of them concurrently;
+    # a job that fails is left out of the later steps
+    jobs = [response_time_job, error_rate_job]
+    results = bulk_put_ml_jobs(es, jobs)
+    exit_on_connection_error(results)
+    failed = report_results("Created job", results)
+    feeds = {f"{job['job_id']}-datafeed": datafeed_config(job) for job in jobs if job["job_id"] not in failed}
+    failed = report_results("Created datafeed", bulk_put_datafeeds(es, feeds))
+    feeds = {datafeed_id: feed for datafeed_id, feed in feeds.items() if datafeed_id not in failed}
+    report_results("Started datafeed", bulk_start_datafeeds(es, feeds))
 
     print("\n==== URL for Visualization ====")
     print(f"Access the visualization at the following URL:")
-    print(f"\n{single_metric_url}\n")
+    print(f"\n{single_metric_url()}\n")
     print("Copy this URL and paste it into your browser to view the visualization.")
     
 except Exception as e:
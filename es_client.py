@@ -0,0 +1,32 @@
+"""
+Shared Elasticsearch Client
+
+This module provides the single Elasticsearch client used by the ML setup
+scripts, so every script talks to the cluster over one pooled, compressed
+connection configured in one place.
+"""
+import os
+import functools
+
+# Configuration parameters (normally would be in .env)
+ELASTICSEARCH_CLOUD_ID = os.getenv("ELASTICSEARCH_CLOUD_ID",
+                                  "ai-agent-monitoring:dXMtZWFzdC0yLmF3cy5lbGFzdGljLWNsb3VkLmNvbSRhYTE2ODUyNDVhODM0NzM3YTFjZTFhMmU0ZWFlN2Y1MCQyYmU1YWExYzQxOTg0NDFhOTI1YzQ2MDMxZjI0Nzc0Mg==")
+ELASTICSEARCH_USERNAME = os.getenv("ELASTICSEARCH_USERNAME", "elastic")
+ELASTICSEARCH_PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "KIuc03ZYAf6IqGkE1zEap1DR")
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """Return the shared Elasticsearch client, creating it on first use"""
+    # Imported here so scripts that never reach the cluster (--help, --dry-run)
+    # don't pay for loading the client and its transport stack
+    from elasticsearch import Elasticsearch
+    
+    return Elasticsearch(
+        cloud_id=ELASTICSEARCH_CLOUD_ID,
+        basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD),
+        # Compress the verbose job/datafeed bodies and keep connections alive
+        http_compress=True,
+        request_timeout=30,
+        max_retries=3,
+        retry_on_timeout=True
+    )
@@ -0,0 +1,77 @@
+"""
+ML Job Bootstrap Helpers
+
+This module holds the job and datafeed creation shared by the ML setup
+scripts. Each helper runs its requests concurrently on one client and
+collects failures per item instead of stopping at the first error.
+Jobs and datafeeds left behind by an earlier run are reused, so the
+scripts can be re-run after a partial failure.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch import ConflictError, NotFoundError
+
+# Upper bound on concurrent ML API requests
+MAX_WORKERS = 8
+
+def _run_all(action, items):
+    """Run action for every (id, body) item concurrently, returning (id, error) pairs"""
+    if not items:
+        return []
+
+    def run(item):
+        item_id, body = item
+        try:
+            action(item_id, body)
+            return item_id, None
+        except Exception as e:
+            return item_id, e
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(items))) as executor:
+        return list(executor.map(run, items))
+
+def bulk_put_ml_jobs(es, jobs):
+    """Create ML jobs from a list of job configs, skipping existing ones; returns (job_id, error) pairs"""
+    def put_job(job_id, job):
+        try:
+            es.ml.get_jobs(job_id=job_id)
+        except NotFoundError:
+            es.ml.put_job(job_id=job_id, body=job)
+
+    return _run_all(put_job, [(job["job_id"], job) for job in jobs])
+
+def bulk_put_datafeeds(es, feeds):
+    """Create datafeeds from a {datafeed_id: config} mapping, skipping existing ones; returns (datafeed_id, error) pairs"""
+    def put_datafeed(datafeed_id, feed):
+        try:
+            es.ml.get_datafeeds(datafeed_id=datafeed_id)
+        except NotFoundError:
+            es.ml.put_datafeed(datafeed_id=datafeed_id, body=feed)
+
+    return _run_all(put_datafeed, list(feeds.items()))
+
+def bulk_start_datafeeds(es, feeds, start="now-7d"):
+    """Open each datafeed's job and start the datafeed; returns (datafeed_id, error) pairs"""
+    def open_and_start(datafeed_id, feed):
+        try:
+            es.ml.open_job(job_id=feed["job_id"])
+        except ConflictError:
+            pass  # Job already opened
+
+        # A datafeed left running by an earlier run needs no restart
+        stats = es.ml.get_datafeed_stats(datafeed_id=datafeed_id)
+        if stats["datafeeds"] and stats["datafeeds"][0]["state"] == "started":
+            return
+        es.ml.start_datafeed(datafeed_id=datafeed_id, start=start)
+
+    return _run_all(open_and_start, list(feeds.items()))
+
+def report_results(action, results):
+    """Print the outcome of a bulk helper and return the IDs that failed"""
+    failed = []
+    for item_id, error in results:
+        if error is None:
+            print(f"{action}: {item_id}")
+        else:
+            print(f"Error for {item_id}: {error}")
+            failed.append(item_id)
+    return failed
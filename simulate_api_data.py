@@ -7,9 +7,16 @@ to test machine learning jobs and alert rules.
 import os
 import random
 import time
+import itertools
+import math
+import multiprocessing
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from elasticsearch import Elasticsearch
+import numpy as np
+import orjson
+from elasticsearch import BadRequestError, Elasticsearch
+from elasticsearch.serializer import JSONSerializer
 import argparse
 
 # Configuration parameters (from environment or defaults)
@@ -54,6 +61,40 @@ SERVICES = [
 
 ENVIRONMENTS = ["production", "staging", "development"]
 
+# Bulk indexing parameters for the normal data load and anomaly injection;
+# the normal data load is split into one-day slices across worker processes
+BULK_PROCESS_COUNT = int(os.getenv("BULK_PROCESS_COUNT", str(os.cpu_count() or 1)))
+BULK_THREAD_COUNT = int(os.getenv("BULK_THREAD_COUNT", "8"))
+BULK_CHUNK_SIZE = 5000
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024  # 10MB
+BULK_QUEUE_SIZE = 4
+BULK_REQUEST_TIMEOUT = 120  # seconds
+
+# NDJSON action line written before every document; the target index is
+# given once in the request path instead
+BULK_ACTION_LINE = b'{"index":{}}\n'
+
+# Settings applied to api_metrics while normal data is bulk loaded,
+# and the settings it is put back to once the load is done
+BULK_LOAD_SETTINGS = {
+    "index": {
+        "refresh_interval": "-1",
+        "number_of_replicas": 0,
+        "translog": {
+            "flush_threshold_size": "1gb"
+        }
+    }
+}
+SERVING_SETTINGS = {
+    "index": {
+        "refresh_interval": "30s",
+        "number_of_replicas": 1,
+        "translog": {
+            "flush_threshold_size": None  # Back to the default
+        }
+    }
+}
+
 ERROR_TYPES = {
     "timeout": [408, "Request timed out"],
     "internal_error": [500, "Internal server error"],
@@ -61,15 +102,65 @@ ERROR_TYPES = {
     "service_unavailable": [503, "Service unavailable"],
     "gateway_timeout": [504, "Gateway timeout"]
 }
+# Error types and their status codes as parallel sequences, sampled by index
+ERROR_TYPE_NAMES = tuple(ERROR_TYPES)
+ERROR_STATUS_CODES = np.array([status_code for status_code, _ in ERROR_TYPES.values()])
+
+# Response time factors looked up per data point instead of recomputed:
+# endpoint complexity (detail endpoints are slightly slower, auth and
+# processing endpoints slower still), peak hours between 9 AM and 5 PM,
+# and lower weekend traffic
+ENDPOINT_FACTORS = {
+    endpoint: 1.1 if "{id}" in endpoint else 1.3 if "auth" in endpoint or "process" in endpoint else 1.0
+    for service in SERVICES for endpoint in service["endpoints"]
+}
+HOUR_FACTORS = np.array([1.5 if 9 <= hour <= 17 else 1.0 for hour in range(24)])
+DAY_FACTORS = np.array([1.0] * 5 + [0.7] * 2)
+
+# SERVICES as parallel tables indexed by [service, environment] (or
+# [service, endpoint]) for the vectorized normal data generator; endpoint
+# rows are padded for services with fewer endpoints
+SERVICE_IDS = [service["api_id"] for service in SERVICES]
+SERVICE_ENDPOINTS = [service["endpoints"] for service in SERVICES]
+ENDPOINT_COUNTS = np.array([len(endpoints) for endpoints in SERVICE_ENDPOINTS])
+BASE_RESPONSE_TIMES = np.array([[service["base_response_time"][env] for env in ENVIRONMENTS] for service in SERVICES])
+ERROR_PROBABILITIES = np.array([[service["error_probability"][env] for env in ENVIRONMENTS] for service in SERVICES])
+ENDPOINT_FACTOR_TABLE = np.array([
+    [ENDPOINT_FACTORS[endpoint] for endpoint in endpoints] + [1.0] * (int(ENDPOINT_COUNTS.max()) - len(endpoints))
+    for endpoints in SERVICE_ENDPOINTS
+])
+
+# Serializer for request bodies; orjson encodes them much faster than the
+# stdlib json module (bulk documents arrive already serialized)
+class OrjsonSerializer(JSONSerializer):
+    def dumps(self, data):
+        # Bodies that are already encoded are passed through unchanged
+        if isinstance(data, (str, bytes)):
+            return super().dumps(data)
+        return orjson.dumps(data, default=self.default)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+def create_client():
+    """Create an Elasticsearch client without contacting the cluster"""
+    return Elasticsearch(
+        cloud_id=ELASTICSEARCH_CLOUD_ID,
+        basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD),
+        serializer=OrjsonSerializer(),
+        # The bulk bodies repeat the same field names for every document,
+        # so they compress very well
+        http_compress=True,
+        request_timeout=BULK_REQUEST_TIMEOUT,
+        retry_on_timeout=True,
+        max_retries=3
+    )
 
 def connect_to_elasticsearch():
     """Connect to Elasticsearch and verify connection"""
     print("Connecting to Elasticsearch...")
     try:
-        es = Elasticsearch(
-            cloud_id=ELASTICSEARCH_CLOUD_ID,
-            basic_auth=(ELASTICSEARCH_USERNAME, ELASTICSEARCH_PASSWORD)
-        )
+        es = create_client()
         
         # Test connection
         info = es.info()
@@ -79,50 +170,59 @@ def connect_to_elasticsearch():
         print(f"Failed to connect to Elasticsearch: {e}")
         return None
 
+# Request ID sequence, seeded from the start time; IDs are unique within a run,
+# but runs started within one run's ID count of milliseconds can overlap
+REQUEST_ID_COUNTER = itertools.count(int(time.time() * 1000))
+
 def generate_request_id():
     """Generate a unique request ID"""
-    return f"req-{int(time.time())}-{random.randint(1000, 9999)}"
+    return f"req-{next(REQUEST_ID_COUNTER):x}"
 
-def calculate_response_time(service, endpoint, environment, hour, day_of_week, is_anomaly=False):
-    """Calculate a realistic response time for the given parameters"""
-    base_response_time = service["base_response_time"][environment]
-    
-    # Time-based variation (peak hours between 9 AM and 5 PM)
-    hour_factor = 1 + (0.5 if 9 <= hour <= 17 else 0)
-    
-    # Day-based variation (weekends have lower traffic)
-    day_factor = 0.7 if day_of_week >= 5 else 1.0
-    
-    # Endpoint complexity factor
-    if "{id}" in endpoint:  # Detail endpoints are slightly slower
-        endpoint_factor = 1.1
-    elif "auth" in endpoint or "process" in endpoint:  # Auth and processing endpoints are slower
-        endpoint_factor = 1.3
-    else:
-        endpoint_factor = 1.0
-        
+def calculate_response_time(service, endpoint, environment, hour, day_of_week, is_anomaly=False, rng=random):
+    """Calculate a realistic response time for the given parameters, drawing from rng"""
     # Calculate response time with some randomness
-    response_time = base_response_time * hour_factor * day_factor * endpoint_factor * random.uniform(0.8, 1.2)
+    response_time = float(service["base_response_time"][environment] * HOUR_FACTORS[hour] * DAY_FACTORS[day_of_week]
+                          * ENDPOINT_FACTORS[endpoint] * rng.uniform(0.8, 1.2))
     
     # If this is an anomaly, increase the response time significantly
     if is_anomaly:
-        response_time *= random.uniform(4.0, 8.0)
+        response_time *= rng.uniform(4.0, 8.0)
     
     return response_time
 
-def generate_error_event(service, endpoint, environment, is_anomaly=False):
-    """Generate an error event with appropriate status code and error type"""
+def calculate_response_times_batch(base, hour_factor, day_factor, endpoint_factors, n, rng, anomaly=False):
+    """Calculate n response times at once; base and endpoint_factors may hold one value per point"""
+    response_times = base * hour_factor * day_factor * endpoint_factors * rng.uniform(0.8, 1.2, n)
+    
+    # If these are anomalies, increase the response times significantly
+    if anomaly:
+        response_times *= rng.uniform(4.0, 8.0, n)
+    
+    return response_times
+
+def generate_error_events_batch(error_probability, n, rng):
+    """Draw n error events at once, returning the error mask and error type indexes
+
+    error_probability may be a scalar or hold one probability per event.
+    """
+    is_errors = rng.random(n) < error_probability
+    error_type_idx = rng.integers(0, len(ERROR_TYPE_NAMES), n)
+    return is_errors, error_type_idx
+
+def generate_error_event(service, endpoint, environment, is_anomaly=False, rng=random):
+    """Generate an error event with appropriate status code and error type, drawing from rng"""
     error_probability = service["error_probability"][environment]
     
     # If this is an anomaly, dramatically increase error probability
     if is_anomaly:
         error_probability *= 10
     
-    is_error = random.random() < error_probability
+    is_error = rng.random() < error_probability
     
     if is_error:
-        error_type = random.choice(list(ERROR_TYPES.keys()))
-        status_code = ERROR_TYPES[error_type][0]
+        error_idx = rng.randrange(len(ERROR_TYPE_NAMES))
+        error_type = ERROR_TYPE_NAMES[error_idx]
+        status_code = int(ERROR_STATUS_CODES[error_idx])
         error_count = 1
     else:
         error_type = None
@@ -131,107 +231,222 @@ def generate_error_event(service, endpoint, environment, is_anomaly=False):
     
     return is_error, error_type, status_code, error_count
 
+def generate_normal_docs(start_time, end_time, data_points_per_service_per_hour):
+    """Yield serialized normal API data documents between start_time and end_time"""
+    rng = np.random.default_rng()
+    
+    # Service and environment of every data point in an hour, in the order
+    # service, environment, point
+    n = data_points_per_service_per_hour
+    service_idx = np.repeat(np.arange(len(SERVICES)), len(ENVIRONMENTS) * n)
+    env_idx = np.tile(np.repeat(np.arange(len(ENVIRONMENTS)), n), len(SERVICES))
+    size = service_idx.size
+    base_response_times = BASE_RESPONSE_TIMES[service_idx, env_idx]
+    error_probabilities = ERROR_PROBABILITIES[service_idx, env_idx]
+    endpoint_counts = ENDPOINT_COUNTS[service_idx]
+    service_idx_list = service_idx.tolist()
+    env_idx_list = env_idx.tolist()
+    
+    # One source dict is reused for every document; it is serialized right
+    # after its fields are set, so overwriting it for the next one is safe
+    source = dict.fromkeys((
+        "@timestamp", "api_id", "api_endpoint", "environment", "service_name", "response_time_ms",
+        "status_code", "is_error", "error_type", "error_count", "request_id"
+    ))
+    
+    # Generate data for each hour in the time range
+    current_time = start_time
+    while current_time < end_time:
+        hour_factor = HOUR_FACTORS[current_time.hour]
+        day_factor = DAY_FACTORS[current_time.weekday()]
+        source["@timestamp"] = current_time
+        
+        # Generate the hour's data points for all services and environments at once
+        endpoint_idx = rng.integers(0, endpoint_counts)
+        response_times = calculate_response_times_batch(
+            base_response_times, hour_factor, day_factor,
+            ENDPOINT_FACTOR_TABLE[service_idx, endpoint_idx], size, rng
+        )
+        is_errors, error_type_idx = generate_error_events_batch(error_probabilities, size, rng)
+        status_codes = np.where(is_errors, ERROR_STATUS_CODES[error_type_idx], 200)
+        
+        for s_idx, en_idx, e_idx, response_time, is_error, t_idx, status_code in zip(
+                service_idx_list, env_idx_list, endpoint_idx.tolist(), response_times.tolist(),
+                is_errors.tolist(), error_type_idx.tolist(), status_codes.tolist()):
+            api_id = SERVICE_IDS[s_idx]
+            source["api_id"] = api_id
+            source["api_endpoint"] = SERVICE_ENDPOINTS[s_idx][e_idx]
+            source["environment"] = ENVIRONMENTS[en_idx]
+            source["service_name"] = api_id
+            source["response_time_ms"] = response_time
+            source["status_code"] = status_code
+            source["is_error"] = is_error
+            source["error_type"] = ERROR_TYPE_NAMES[t_idx] if is_error else None
+            source["error_count"] = 1 if is_error else 0
+            source["request_id"] = generate_request_id()
+            yield orjson.dumps(source)
+        
+        # Move to the next hour
+        current_time += timedelta(hours=1)
+
+def bulk_bodies(docs):
+    """Group serialized documents into NDJSON bulk bodies, yielding (document count, body)"""
+    parts, count, size = [], 0, 0
+    for doc in docs:
+        line_size = len(BULK_ACTION_LINE) + len(doc) + 1
+        if count and (count >= BULK_CHUNK_SIZE or size + line_size > BULK_MAX_CHUNK_BYTES):
+            yield count, b"".join(parts)
+            parts, count, size = [], 0, 0
+        parts += (BULK_ACTION_LINE, doc, b"\n")
+        count += 1
+        size += line_size
+    if parts:
+        yield count, b"".join(parts)
+
+def send_bulk_body(es, index, count, body):
+    """Send one NDJSON bulk body, returning (success, failed, first error)"""
+    # Only failed items come back, so successful ones are never parsed
+    response = es.options(request_timeout=BULK_REQUEST_TIMEOUT).bulk(
+        index=index, operations=body, filter_path="errors,items.*.error"
+    )
+    if not response.get("errors"):
+        return count, 0, None
+    errors = [error for item in response.get("items", []) for error in item.values()]
+    return count - len(errors), len(errors), errors[0] if errors else None
+
+def index_actions(es, actions, thread_count=BULK_THREAD_COUNT, index="api_metrics"):
+    """Index serialized documents into index, returning the (success, failed) counts
+
+    The documents are written straight into NDJSON bulk bodies, which up to
+    thread_count threads send while the next bodies are being built.
+    """
+    success, failed = 0, 0
+    
+    def collect(futures):
+        nonlocal success, failed
+        for future in futures:
+            body_success, body_failed, error = future.result()
+            if error is not None and not failed:
+                print(f"First failed document: {error}")
+            success += body_success
+            failed += body_failed
+    
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        pending = set()
+        for count, body in bulk_bodies(actions):
+            # Bound the number of bodies held in memory
+            if len(pending) >= thread_count + BULK_QUEUE_SIZE:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(send_bulk_body, es, index, count, body))
+        collect(wait(pending).done)
+    return success, failed
+
+def index_normal_data_slice(task):
+    """Index normal data for one slice of hours in a worker process"""
+    slice_start, slice_end, data_points_per_service_per_hour, thread_count, id_start = task
+    
+    # Draw request IDs from this slice's own range so they stay unique
+    global REQUEST_ID_COUNTER
+    REQUEST_ID_COUNTER = itertools.count(id_start)
+    
+    # Clients aren't fork-safe, so every worker opens its own
+    es = create_client()
+    try:
+        # Documents are generated lazily while worker threads send the bulk
+        # requests, so generation overlaps with indexing
+        success, failed = index_actions(
+            es, generate_normal_docs(slice_start, slice_end, data_points_per_service_per_hour), thread_count
+        )
+        return slice_end, success, failed
+    except Exception as e:
+        # Count the whole slice as failed so the totals show the missing data
+        print(f"Error indexing data from {slice_start} to {slice_end}: {e}")
+        hours = math.ceil((slice_end - slice_start) / timedelta(hours=1))
+        return slice_end, 0, hours * len(SERVICES) * len(ENVIRONMENTS) * data_points_per_service_per_hour
+    finally:
+        es.close()
+
 def generate_normal_data(es, start_time, duration_days, data_points_per_service_per_hour=20):
     """Generate normal API data for the specified duration"""
     print(f"Generating normal data for {duration_days} days...")
     
-    bulk_data = []
-    docs_generated = 0
-    
     now = datetime.now()
     end_time = now
     start_time = end_time - timedelta(days=duration_days)
     
-    # Generate data for each hour in the time range
-    current_time = start_time
-    while current_time < end_time:
-        hour = current_time.hour
-        day_of_week = current_time.weekday()
+    success, failed = 0, 0
+    try:
+        # Create the index up front so refreshes can be turned off for the load
+        try:
+            es.indices.create(index="api_metrics")
+        except BadRequestError as e:
+            if e.error != "resource_already_exists_exception":
+                raise
+        es.indices.put_settings(index="api_metrics", settings=BULK_LOAD_SETTINGS)
         
-        # For each service and environment
-        for service in SERVICES:
-            for environment in ENVIRONMENTS:
-                # Generate multiple data points per hour
-                for _ in range(data_points_per_service_per_hour):
-                    # Pick a random endpoint
-                    endpoint = random.choice(service["endpoints"])
-                    
-                    # Calculate response time
-                    response_time = calculate_response_time(service, endpoint, environment, hour, day_of_week)
-                    
-                    # Determine if this is an error
-                    is_error, error_type, status_code, error_count = generate_error_event(service, endpoint, environment)
-                    
-                    # Create document
-                    doc = {
-                        "_index": "api_metrics",
-                        "_source": {
-                            "@timestamp": current_time.isoformat(),
-                            "api_id": service["api_id"],
-                            "api_endpoint": endpoint,
-                            "environment": environment,
-                            "service_name": service["api_id"],
-                            "response_time_ms": response_time,
-                            "status_code": status_code,
-                            "is_error": is_error,
-                            "error_type": error_type,
-                            "error_count": error_count,
-                            "request_id": generate_request_id()
-                        }
-                    }
-                    
-                    bulk_data.append(doc)
-                    docs_generated += 1
-                    
-                    # Index in batches of 1000 documents
-                    if len(bulk_data) >= 1000:
-                        try:
-                            from elasticsearch.helpers import bulk
-                            success, failed = bulk(es, bulk_data)
-                            print(f"Indexed {success} documents, {len(failed) if failed else 0} failed")
-                            bulk_data = []
-                        except Exception as e:
-                            print(f"Error indexing data: {e}")
+        # The hours are independent, so one-day slices are generated and
+        # indexed in parallel worker processes
+        slice_starts = []
+        slice_start = start_time
+        while slice_start < end_time:
+            slice_starts.append(slice_start)
+            slice_start += timedelta(days=1)
+        processes = max(1, min(BULK_PROCESS_COUNT, len(slice_starts)))
+        thread_count = max(1, BULK_THREAD_COUNT // processes)
         
-        # Move to the next hour
-        current_time += timedelta(hours=1)
+        # Give every slice its own request ID range, sized for a full day of
+        # documents, and move this process's counter past all of them so IDs
+        # generated later (e.g. for anomalies) don't repeat the workers' IDs
+        global REQUEST_ID_COUNTER
+        ids_per_slice = 24 * len(SERVICES) * len(ENVIRONMENTS) * data_points_per_service_per_hour
+        id_start = next(REQUEST_ID_COUNTER)
+        REQUEST_ID_COUNTER = itertools.count(id_start + len(slice_starts) * ids_per_slice)
+        tasks = [
+            (slice_start, min(slice_start + timedelta(days=1), end_time), data_points_per_service_per_hour,
+             thread_count, id_start + i * ids_per_slice)
+            for i, slice_start in enumerate(slice_starts)
+        ]
         
-        # Print progress every day
-        if current_time.hour == 0:
-            days_left = (end_time - current_time).days
-            print(f"Progress: Generated data up to {current_time}, {days_left} days left")
+        with multiprocessing.Pool(processes=processes) as pool:
+            for done, (slice_end, slice_success, slice_failed) in enumerate(
+                    pool.imap_unordered(index_normal_data_slice, tasks), 1):
+                success += slice_success
+                failed += slice_failed
+                print(f"Progress: Generated data up to {slice_end}, {len(tasks) - done} days left")
+    except Exception as e:
+        print(f"Error indexing data: {e}")
+    finally:
+        # Restore the normal settings and make the new documents searchable
+        try:
+            es.indices.put_settings(index="api_metrics", settings=SERVING_SETTINGS)
+            es.indices.refresh(index="api_metrics")
+        except Exception as e:
+            print(f"Error restoring index settings: {e}")
     
-    # Index any remaining documents
-    if bulk_data:
+    # Merge the segments left by the load; this runs once the load is over
+    # so it doesn't compete with indexing
+    if success:
         try:
-            from elasticsearch.helpers import bulk
-            success, failed = bulk(es, bulk_data)
-            print(f"Indexed final batch: {success} documents, {len(failed) if failed else 0} failed")
+            es.options(request_timeout=BULK_REQUEST_TIMEOUT * 5).indices.forcemerge(index="api_metrics", max_num_segments=1)
         except Exception as e:
-            print(f"Error indexing final batch: {e}")
+            print(f"Error force merging api_metrics: {e}")
     
+    docs_generated = success + failed
+    print(f"Indexed {success} documents, {failed} failed")
     print(f"Normal data generation complete. Generated {docs_generated} documents.")
     return docs_generated
 
-def inject_response_time_anomaly(es, service_id, environment, duration_minutes=30, data_points=50):
-    """Inject a response time anomaly for a specific service and environment"""
-    print(f"Injecting response time anomaly for {service_id} in {environment} environment...")
-    
-    service = next((s for s in SERVICES if s["api_id"] == service_id), None)
-    if not service:
-        print(f"Service {service_id} not found")
-        return 0
+def response_time_anomaly_docs(service, environment, duration_minutes, data_points):
+    """Yield serialized documents for a response time anomaly centered around the current time"""
+    # A generator-local Random avoids the shared module-level instance
+    rng = random.Random()
     
     # Select a random endpoint or use the first one
-    endpoint = random.choice(service["endpoints"]) if service["endpoints"] else service["endpoints"][0]
+    endpoint = rng.choice(service["endpoints"]) if service["endpoints"] else service["endpoints"][0]
     
     # Time range for the anomaly (centered around current time)
-    now = datetime.now()
-    start_time = now - timedelta(minutes=duration_minutes/2)
-    end_time = now + timedelta(minutes=duration_minutes/2)
-    
-    bulk_data = []
-    docs_generated = 0
+    start_time = datetime.now() - timedelta(minutes=duration_minutes/2)
     
     # Generate anomalous data points
     time_interval = duration_minutes * 60 / data_points  # in seconds
@@ -241,60 +456,33 @@ def inject_response_time_anomaly(es, service_id, environment, duration_minutes=3
         point_time = start_time + timedelta(seconds=i * time_interval)
         
         # Calculate anomalous response time
-        current_hour = point_time.hour
-        current_day = point_time.weekday()
-        response_time = calculate_response_time(service, endpoint, environment, current_hour, current_day, is_anomaly=True)
-        
-        # Create document
-        doc = {
-            "_index": "api_metrics",
-            "_source": {
-                "@timestamp": point_time.isoformat(),
-                "api_id": service["api_id"],
-                "api_endpoint": endpoint,
-                "environment": environment,
-                "service_name": service["api_id"],
-                "response_time_ms": response_time,
-                "status_code": 200,  # Usually high response times don't result in errors
-                "is_error": False,
-                "error_count": 0,
-                "request_id": generate_request_id()
-            }
-        }
+        response_time = calculate_response_time(service, endpoint, environment, point_time.hour, point_time.weekday(),
+                                                is_anomaly=True, rng=rng)
         
-        bulk_data.append(doc)
-        docs_generated += 1
-    
-    # Index the documents
-    try:
-        from elasticsearch.helpers import bulk
-        success, failed = bulk(es, bulk_data)
-        print(f"Indexed {success} anomalous response time documents, {len(failed) if failed else 0} failed")
-    except Exception as e:
-        print(f"Error indexing anomalous response time data: {e}")
-    
-    print(f"Response time anomaly injection complete. Generated {docs_generated} documents.")
-    return docs_generated
+        yield orjson.dumps({
+            "@timestamp": point_time,
+            "api_id": service["api_id"],
+            "api_endpoint": endpoint,
+            "environment": environment,
+            "service_name": service["api_id"],
+            "response_time_ms": response_time,
+            "status_code": 200,  # Usually high response times don't result in errors
+            "is_error": False,
+            "error_count": 0,
+            "request_id": generate_request_id()
+        })
 
-def inject_error_rate_anomaly(es, service_id, environment, duration_minutes=30, data_points=40):
-    """Inject an error rate anomaly for a specific service and environment"""
-    print(f"Injecting error rate anomaly for {service_id} in {environment} environment...")
-    
-    service = next((s for s in SERVICES if s["api_id"] == service_id), None)
-    if not service:
-        print(f"Service {service_id} not found")
-        return 0
+def error_rate_anomaly_docs(service, environment, duration_minutes, data_points):
+    """Yield serialized documents for an error rate anomaly centered around the current time"""
+    # A generator-local Random avoids the shared module-level instance
+    rng = random.Random()
+    randrange = rng.randrange
     
     # Select a random endpoint or use the first one
-    endpoint = random.choice(service["endpoints"]) if service["endpoints"] else service["endpoints"][0]
+    endpoint = rng.choice(service["endpoints"]) if service["endpoints"] else service["endpoints"][0]
     
     # Time range for the anomaly (centered around current time)
-    now = datetime.now()
-    start_time = now - timedelta(minutes=duration_minutes/2)
-    end_time = now + timedelta(minutes=duration_minutes/2)
-    
-    bulk_data = []
-    docs_generated = 0
+    start_time = datetime.now() - timedelta(minutes=duration_minutes/2)
     
     # Generate anomalous data points
     time_interval = duration_minutes * 60 / data_points  # in seconds
@@ -304,42 +492,66 @@ def inject_error_rate_anomaly(es, service_id, environment, duration_minutes=30,
         point_time = start_time + timedelta(seconds=i * time_interval)
         
         # Calculate normal response time
-        current_hour = point_time.hour
-        current_day = point_time.weekday()
-        response_time = calculate_response_time(service, endpoint, environment, current_hour, current_day)
+        response_time = calculate_response_time(service, endpoint, environment, point_time.hour, point_time.weekday(),
+                                                rng=rng)
         
         # Force errors for anomaly
-        error_type_key = random.choice(list(ERROR_TYPES.keys()))
-        status_code = ERROR_TYPES[error_type_key][0]
+        error_idx = randrange(len(ERROR_TYPE_NAMES))
+        error_type_key = ERROR_TYPE_NAMES[error_idx]
+        status_code = int(ERROR_STATUS_CODES[error_idx])
         
-        # Create document
-        doc = {
-            "_index": "api_metrics",
-            "_source": {
-                "@timestamp": point_time.isoformat(),
-                "api_id": service["api_id"],
-                "api_endpoint": endpoint,
-                "environment": environment,
-                "service_name": service["api_id"],
-                "response_time_ms": response_time,
-                "status_code": status_code,
-                "is_error": True,
-                "error_type": error_type_key,
-                "error_count": 1,
-                "request_id": generate_request_id()
-            }
-        }
-        
-        bulk_data.append(doc)
-        docs_generated += 1
-    
-    # Index the documents
+        yield orjson.dumps({
+            "@timestamp": point_time,
+            "api_id": service["api_id"],
+            "api_endpoint": endpoint,
+            "environment": environment,
+            "service_name": service["api_id"],
+            "response_time_ms": response_time,
+            "status_code": status_code,
+            "is_error": True,
+            "error_type": error_type_key,
+            "error_count": 1,
+            "request_id": generate_request_id()
+        })
+
+def index_anomaly_docs(es, actions, description):
+    """Index anomaly documents in one bulk pass, returning the number of documents"""
+    success, failed = 0, 0
     try:
-        from elasticsearch.helpers import bulk
-        success, failed = bulk(es, bulk_data)
-        print(f"Indexed {success} anomalous error rate documents, {len(failed) if failed else 0} failed")
+        success, failed = index_actions(es, actions)
+        print(f"Indexed {success} anomalous {description} documents, {failed} failed")
     except Exception as e:
-        print(f"Error indexing anomalous error rate data: {e}")
+        print(f"Error indexing anomalous {description} data: {e}")
+    return success + failed
+
+def inject_response_time_anomaly(es, service_id, environment, duration_minutes=30, data_points=50):
+    """Inject a response time anomaly for a specific service and environment"""
+    print(f"Injecting response time anomaly for {service_id} in {environment} environment...")
+    
+    service = next((s for s in SERVICES if s["api_id"] == service_id), None)
+    if not service:
+        print(f"Service {service_id} not found")
+        return 0
+    
+    docs_generated = index_anomaly_docs(
+        es, response_time_anomaly_docs(service, environment, duration_minutes, data_points), "response time"
+    )
+    
+    print(f"Response time anomaly injection complete. Generated {docs_generated} documents.")
+    return docs_generated
+
+def inject_error_rate_anomaly(es, service_id, environment, duration_minutes=30, data_points=40):
+    """Inject an error rate anomaly for a specific service and environment"""
+    print(f"Injecting error rate anomaly for {service_id} in {environment} environment...")
+    
+    service = next((s for s in SERVICES if s["api_id"] == service_id), None)
+    if not service:
+        print(f"Service {service_id} not found")
+        return 0
+    
+    docs_generated = index_anomaly_docs(
+        es, error_rate_anomaly_docs(service, environment, duration_minutes, data_points), "error rate"
+    )
     
     print(f"Error rate anomaly injection complete. Generated {docs_generated} documents.")
     return docs_generated
@@ -353,11 +565,10 @@ def inject_cross_environment_anomaly(es, service_id, duration_minutes=30, data_p
         print(f"Service {service_id} not found")
         return 0
     
-    docs_generated = 0
-    
     # Inject anomalies in each environment with a slight delay between them
     delay_between_envs = 5  # minutes
     
+    generators = []
     for i, environment in enumerate(ENVIRONMENTS):
         # Calculate start time with increasing delay for each environment
         env_delay = i * delay_between_envs
@@ -367,17 +578,11 @@ def inject_cross_environment_anomaly(es, service_id, duration_minutes=30, data_p
             continue
         
         # Inject both response time and error anomalies
-        docs_generated += inject_response_time_anomaly(
-            es, service_id, environment, 
-            duration_minutes=env_duration, 
-            data_points=data_points_per_env
-        )
-        
-        docs_generated += inject_error_rate_anomaly(
-            es, service_id, environment, 
-            duration_minutes=env_duration, 
-            data_points=data_points_per_env
-        )
+        generators.append(response_time_anomaly_docs(service, environment, env_duration, data_points_per_env))
+        generators.append(error_rate_anomaly_docs(service, environment, env_duration, data_points_per_env))
+    
+    # All environments' documents go through a single bulk pass
+    docs_generated = index_anomaly_docs(es, itertools.chain(*generators), "cross-environment")
     
     print(f"Cross-environment anomaly injection complete. Generated {docs_generated} documents.")
     return docs_generated
@@ -1,19 +1,35 @@
 """
 Alert generator for API monitoring system.
 """
+import bisect
 import logging
+import statistics
 import uuid
-from typing import Dict, List, Set
+import numpy as np
+from collections import Counter
+from typing import Dict, List, NamedTuple, Set, Tuple
 from datetime import datetime
 
 from src.models.api import Anomaly, Alert, Environment
 
 logger = logging.getLogger(__name__)
 
+# Groups at least this large use NumPy for severity statistics; smaller groups
+# are cheaper to summarise in plain Python than to convert to an array
+NUMPY_STATS_MIN_GROUP = 64
+
+class AlertText(NamedTuple):
+    """Title and description of an alert."""
+    title: str
+    description: str
+
 class AlertGenerator:
     """
     Generator for creating alerts from anomalies.
     """
+    # Readable names of anomaly types, e.g. "response_time" -> "Response Time"
+    _READABLE_TYPES: Dict[str, str] = {}
+    
     def __init__(self):
         """
         Initialize the alert generator.
@@ -24,13 +40,18 @@ class AlertGenerator:
             "medium": 0.4,     # Anomalies with severity >= 0.4 are medium
             "low": 0.0         # All other anomalies are low
         }
+        
+        # Thresholds in ascending order with their labels, for bisect lookups
+        ordered = sorted(self.severity_thresholds.items(), key=lambda item: item[1])
+        self._threshold_values = [threshold for _, threshold in ordered]
+        self._threshold_labels = [label for label, _ in ordered]
     
-    def generate_alerts(self, grouped_anomalies: Dict[str, List[Anomaly]]) -> List[Alert]:
+    def generate_alerts(self, grouped_anomalies: Dict[Tuple[str, str], List[Anomaly]]) -> List[Alert]:
         """
         Generate alerts from grouped anomalies.
         
         Args:
-            grouped_anomalies: Dictionary of grouped anomalies.
+            grouped_anomalies: Dictionary of grouped anomalies, keyed by (API ID, anomaly type).
             
         Returns:
             List of generated alerts.
@@ -48,12 +69,12 @@ class AlertGenerator:
         
         return alerts
     
-    def _create_alert_from_group(self, group_key: str, anomalies: List[Anomaly]) -> Alert:
+    def _create_alert_from_group(self, group_key: Tuple[str, str], anomalies: List[Anomaly]) -> Alert:
         """
         Create an alert from a group of anomalies.
         
         Args:
-            group_key: The group key.
+            group_key: The (API ID, anomaly type) group key.
             anomalies: List of anomalies in the group.
             
         Returns:
@@ -62,20 +83,42 @@ class AlertGenerator:
         if not anomalies:
             return None
         
-        # Extract API ID and anomaly type from the group key
-        api_id, anomaly_type = group_key.split(":", 1)
+        api_id, anomaly_type = group_key
         
-        # Calculate max severity across all anomalies
-        max_severity = max(anomaly.severity for anomaly in anomalies)
+        # Collect severities, affected environments and endpoints in a single pass
+        severities = []
+        environments = set()
+        endpoints = set()
+        for anomaly in anomalies:
+            severities.append(anomaly.severity)
+            if anomaly.environment:
+                environments.add(anomaly.environment)
+            if anomaly.context and "endpoint" in anomaly.context:
+                endpoints.add(anomaly.context["endpoint"])
+        
+        # Severity statistics over the whole group
+        if len(severities) >= NUMPY_STATS_MIN_GROUP:
+            severity_values = np.fromiter(severities, dtype=float, count=len(severities))
+            max_severity = float(severity_values.max())
+            avg_severity = float(severity_values.mean())
+            p95_severity = float(np.quantile(severity_values, 0.95))
+        else:
+            max_severity = float(max(severities))
+            avg_severity = sum(severities) / len(severities)
+            # The 19th of 20 inclusive cut points is the 95th percentile;
+            # quantiles() needs at least two values
+            if len(severities) > 1:
+                p95_severity = statistics.quantiles(severities, n=20, method="inclusive")[18]
+            else:
+                p95_severity = max_severity
         
         # Determine alert severity
         alert_severity = self._get_alert_severity(max_severity)
         
-        # Get unique environments affected
-        environments = self._get_affected_environments(anomalies)
-        
         # Create alert title and description
-        title, description = self._generate_alert_text(anomalies, anomaly_type, environments)
+        title, description = self._generate_alert_text(
+            anomalies, anomaly_type, environments, max_severity, avg_severity
+        )
         
         # Create alert
         alert = Alert(
@@ -88,8 +131,8 @@ class AlertGenerator:
             anomalies=[anomaly.id for anomaly in anomalies],
             apis=[api_id],
             environments=list(environments),
-            tags=self._generate_tags(anomalies, anomaly_type),
-            metadata=self._generate_metadata(anomalies)
+            tags=self._generate_tags(anomaly_type, environments, endpoints),
+            metadata=self._generate_metadata(anomalies, severities, avg_severity, p95_severity)
         )
         
         return alert
@@ -104,28 +147,11 @@ class AlertGenerator:
         Returns:
             Alert severity (critical, high, medium, low).
         """
-        if max_anomaly_severity >= self.severity_thresholds["critical"]:
-            return "critical"
-        elif max_anomaly_severity >= self.severity_thresholds["high"]:
-            return "high"
-        elif max_anomaly_severity >= self.severity_thresholds["medium"]:
-            return "medium"
-        else:
-            return "low"
+        index = bisect.bisect_right(self._threshold_values, max_anomaly_severity) - 1
+        return self._threshold_labels[max(index, 0)]
     
-    def _get_affected_environments(self, anomalies: List[Anomaly]) -> Set[Environment]:
-        """
-        Get unique environments affected by anomalies.
-        
-        Args:
-            anomalies: List of anomalies.
-            
-        Returns:
-            Set of affected environments.
-        """
-        return {anomaly.environment for anomaly in anomalies if anomaly.environment}
-    
-    def _generate_alert_text(self, anomalies: List[Anomaly], anomaly_type: str, environments: Set[Environment]) -> tuple:
+    def _generate_alert_text(self, anomalies: List[Anomaly], anomaly_type: str, environments: Set[Environment],
+                             max_severity: float, avg_severity: float) -> AlertText:
         """
         Generate alert title and description.
         
@@ -133,18 +159,22 @@ class AlertGenerator:
             anomalies: List of anomalies.
             anomaly_type: Type of anomalies.
             environments: Set of affected environments.
+            max_severity: Maximum severity across the anomalies.
+            avg_severity: Average severity across the anomalies.
             
         Returns:
-            Tuple of (title, description).
+            AlertText with the title and description.
         """
         # First anomaly for reference
         first_anomaly = anomalies[0]
         
         # Readable anomaly type
-        readable_type = anomaly_type.replace("_", " ").title()
+        readable_type = self._READABLE_TYPES.get(anomaly_type)
+        if readable_type is None:
+            readable_type = self._READABLE_TYPES[anomaly_type] = anomaly_type.replace("_", " ").title()
         
-        # Environment string
-        env_str = ", ".join(env.value for env in environments)
+        # Environment names, formatted once for the title and description
+        env_names = [env.value for env in environments]
         
         # Get API details (would come from database in a real implementation)
         api_name = f"API {first_anomaly.api_id}"  # Placeholder
@@ -156,48 +186,47 @@ class AlertGenerator:
             title = f"Multiple {readable_type} Anomalies Detected in {api_name}"
         
         # Include environments in title if there are multiple
-        if len(environments) == 1:
-            title += f" ({next(iter(environments)).value})"
-        elif len(environments) > 1:
-            title += f" (Multiple Environments)"
+        if len(env_names) == 1:
+            title = f"{title} ({env_names[0]})"
+        elif len(env_names) > 1:
+            title = f"{title} (Multiple Environments)"
         
-        # Generate description
+        # Generate description from sentence parts joined once at the end
         if len(anomalies) == 1:
-            description = first_anomaly.description
+            parts = [first_anomaly.description]
             
             # Add additional context
             if first_anomaly.expected_value is not None and first_anomaly.metric_value is not None:
-                description += f" Current value: {first_anomaly.metric_value:.2f}, Expected: {first_anomaly.expected_value:.2f}."
+                parts.append(f"Current value: {first_anomaly.metric_value:.2f}, Expected: {first_anomaly.expected_value:.2f}.")
             
             if first_anomaly.threshold is not None:
-                description += f" Threshold: {first_anomaly.threshold:.2f}."
+                parts.append(f"Threshold: {first_anomaly.threshold:.2f}.")
             
             # Add environment info
-            description += f" Environment: {first_anomaly.environment.value}."
+            parts.append(f"Environment: {first_anomaly.environment.value}.")
             
         else:
-            description = f"{len(anomalies)} {readable_type.lower()} anomalies detected in {api_name}."
+            parts = [f"{len(anomalies)} {readable_type.lower()} anomalies detected in {api_name}."]
             
             # Add environment info
-            if len(environments) == 1:
-                description += f" Environment: {next(iter(environments)).value}."
+            if len(env_names) == 1:
+                parts.append(f"Environment: {env_names[0]}.")
             else:
-                description += f" Environments affected: {env_str}."
+                parts.append(f"Environments affected: {', '.join(env_names)}.")
             
             # Add severity info
-            max_severity = max(anomaly.severity for anomaly in anomalies)
-            avg_severity = sum(anomaly.severity for anomaly in anomalies) / len(anomalies)
-            description += f" Max severity: {max_severity:.2f}, Average severity: {avg_severity:.2f}."
+            parts.append(f"Max severity: {max_severity:.2f}, Average severity: {avg_severity:.2f}.")
         
-        return title, description
+        return AlertText(title, " ".join(parts))
     
-    def _generate_tags(self, anomalies: List[Anomaly], anomaly_type: str) -> List[str]:
+    def _generate_tags(self, anomaly_type: str, environments: Set[Environment], endpoints: Set[str]) -> List[str]:
         """
         Generate tags for the alert.
         
         Args:
-            anomalies: List of anomalies.
             anomaly_type: Type of anomalies.
+            environments: Set of affected environments.
+            endpoints: Set of affected endpoints from the anomaly context.
             
         Returns:
             List of tags.
@@ -205,16 +234,10 @@ class AlertGenerator:
         tags = [anomaly_type]
         
         # Add environment tags
-        environments = self._get_affected_environments(anomalies)
         for env in environments:
             tags.append(f"env:{env.value}")
         
         # Add endpoint tags if they exist in context
-        endpoints = set()
-        for anomaly in anomalies:
-            if anomaly.context and "endpoint" in anomaly.context:
-                endpoints.add(anomaly.context["endpoint"])
-        
         for endpoint in endpoints:
             # Simplify endpoint path for tagging
             simplified = endpoint.split("/")[-1] if "/" in endpoint else endpoint
@@ -223,12 +246,16 @@ class AlertGenerator:
         
         return tags
     
-    def _generate_metadata(self, anomalies: List[Anomaly]) -> Dict:
+    def _generate_metadata(self, anomalies: List[Anomaly], severities: List[float], avg_severity: float,
+                           p95_severity: float) -> Dict:
         """
         Generate metadata for the alert.
         
         Args:
             anomalies: List of anomalies.
+            severities: Severity of each anomaly, in order.
+            avg_severity: Average severity across the anomalies.
+            p95_severity: 95th percentile severity across the anomalies.
             
         Returns:
             Metadata dictionary.
@@ -236,23 +263,19 @@ class AlertGenerator:
         metadata = {
             "anomaly_count": len(anomalies),
             "timestamps": [anomaly.timestamp.isoformat() for anomaly in anomalies],
-            "severities": [anomaly.severity for anomaly in anomalies],
-            "avg_severity": sum(anomaly.severity for anomaly in anomalies) / len(anomalies)
+            "severities": severities,
+            "avg_severity": avg_severity,
+            "p95_severity": p95_severity
         }
         
         # Add endpoint information if available
-        endpoints = {}
-        for anomaly in anomalies:
-            if anomaly.context and "endpoint" in anomaly.context:
-                endpoint = anomaly.context["endpoint"]
-                method = anomaly.context.get("method", "UNKNOWN")
-                key = f"{method}:{endpoint}"
-                
-                if key not in endpoints:
-                    endpoints[key] = 0
-                endpoints[key] += 1
+        endpoints = Counter(
+            f"{anomaly.context.get('method', 'UNKNOWN')}:{anomaly.context['endpoint']}"
+            for anomaly in anomalies
+            if anomaly.context and "endpoint" in anomaly.context
+        )
         
         if endpoints:
-            metadata["affected_endpoints"] = endpoints
+            metadata["affected_endpoints"] = dict(endpoints)
         
         return metadata 
\ No newline at end of file
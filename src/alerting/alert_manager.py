@@ -4,9 +4,12 @@ Alert manager for API monitoring system.
 import asyncio
 import logging
 import uuid
-from typing import Dict, List, Optional, Any, Set
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime, timedelta
 
+from cachetools import TTLCache
+
 from config.settings import Settings
 from src.alerting.alert_generator import AlertGenerator
 from src.alerting.channels.slack_notifier import SlackNotifier
@@ -19,6 +22,19 @@ logger = logging.getLogger(__name__)
 # Create settings instance
 settings = Settings()
 
+# Maximum number of recently notified alert IDs remembered for deduplication
+ALERT_CACHE_SIZE = 10_000
+
+# Maximum number of unprocessed anomalies fetched per alerting cycle; a full
+# page means more are waiting, so the loop polls again without sleeping
+ANOMALY_PAGE_SIZE = 500
+
+# Upper bound on the poll interval while no anomalies are pending
+MAX_IDLE_INTERVAL = max(settings.ANOMALY_DETECTION_INTERVAL, settings.ALERT_MAX_POLL_INTERVAL)
+
+# Alert severities that trigger notifications
+_NOTIFY_SEVERITIES = frozenset(("high", "critical"))
+
 class AlertManager:
     """
     Manager for generating and sending alerts.
@@ -29,10 +45,21 @@ class AlertManager:
         """
         self.running = False
         self.db = get_database()
-        self.alert_tasks = []
+        # Running alerting tasks; each removes itself when done
+        self.alert_tasks: Set[asyncio.Task] = set()
+        self._idle_backoff = settings.ANOMALY_DETECTION_INTERVAL
         self.alert_generator = AlertGenerator()
         self.notifiers = self._initialize_notifiers()
-        self.alert_cache = set()  # Cache for recent alert IDs to avoid duplicates
+        # Per-channel send timeouts; channels not listed use NOTIFY_TIMEOUT_SECONDS
+        self.notify_timeouts = {
+            'email': settings.EMAIL_NOTIFY_TIMEOUT_SECONDS
+        }
+        # Recently notified alert IDs, expired after the dedup window so an
+        # alert re-firing later is notified again
+        self.alert_cache: TTLCache = TTLCache(
+            maxsize=ALERT_CACHE_SIZE,
+            ttl=settings.ALERT_DEDUP_TTL_SECONDS
+        )
     
     def _initialize_notifiers(self) -> Dict[str, Any]:
         """
@@ -68,7 +95,8 @@ class AlertManager:
         
         # Start alerting tasks
         alert_task = asyncio.create_task(self._alerting_loop())
-        self.alert_tasks.append(alert_task)
+        self.alert_tasks.add(alert_task)
+        alert_task.add_done_callback(self.alert_tasks.discard)
     
     async def stop_alerting(self):
         """
@@ -77,16 +105,24 @@ class AlertManager:
         logger.info("Stopping alert generation and notification")
         self.running = False
         
-        # Cancel all alerting tasks
-        for task in self.alert_tasks:
+        # Cancel all alerting tasks, iterating a snapshot since finished
+        # tasks remove themselves from the set
+        tasks = list(self.alert_tasks)
+        for task in tasks:
             if not task.done():
                 task.cancel()
         
         # Wait for tasks to complete
-        if self.alert_tasks:
-            await asyncio.gather(*self.alert_tasks, return_exceptions=True)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
         
-        self.alert_tasks = []
+        # Close notifier connections
+        for channel, notifier in self.notifiers.items():
+            if hasattr(notifier, "aclose"):
+                try:
+                    await notifier.aclose()
+                except Exception as e:
+                    logger.error(f"Error closing {channel} notifier: {str(e)}")
     
     async def _alerting_loop(self):
         """
@@ -102,35 +138,40 @@ class AlertManager:
                 
                 # Get recent unprocessed anomalies
                 try:
-                    anomalies = await self.db.get_unprocessed_anomalies()
+                    anomalies = await self.db.get_unprocessed_anomalies(limit=ANOMALY_PAGE_SIZE)
                 except AttributeError:
                     logger.warning("Database method not available, skipping alert processing")
                     await asyncio.sleep(settings.ANOMALY_DETECTION_INTERVAL)
                     continue
                 
-                if anomalies:
-                    logger.debug(f"Processing {len(anomalies)} new anomalies")
-                    
-                    # Group anomalies by API and other dimensions
-                    grouped_anomalies = self._group_anomalies(anomalies)
-                    
-                    # Generate alerts from grouped anomalies
-                    alerts = self.alert_generator.generate_alerts(grouped_anomalies)
+                if not anomalies:
+                    # Back off exponentially while there is nothing to process
+                    self._idle_backoff = min(self._idle_backoff * 2, MAX_IDLE_INTERVAL)
+                    await asyncio.sleep(self._idle_backoff)
+                    continue
+                
+                self._idle_backoff = settings.ANOMALY_DETECTION_INTERVAL
+                logger.debug(f"Processing {len(anomalies)} new anomalies")
+                
+                # Group anomalies by API and other dimensions
+                grouped_anomalies, anomaly_ids = self._group_anomalies(anomalies)
+                
+                # Generate alerts from grouped anomalies
+                alerts = self.alert_generator.generate_alerts(grouped_anomalies)
+                
+                # Store alerts and mark anomalies as processed together; if
+                # storing fails the anomalies stay unprocessed and are retried
+                await self.db.store_alerts_and_mark(alerts, anomaly_ids)
+                
+                if alerts:
+                    logger.info(f"Generated and stored {len(alerts)} alerts")
                     
-                    if alerts:
-                        # Store alerts in database
-                        await self.db.store_alerts(alerts)
-                        logger.info(f"Generated and stored {len(alerts)} alerts")
-                        
-                        # Send notifications for high severity alerts
-                        await self._send_notifications(alerts)
-                        
-                        # Mark anomalies as processed
-                        anomaly_ids = [anomaly.id for anomaly in anomalies]
-                        await self.db.mark_anomalies_processed(anomaly_ids)
+                    # Send notifications for high severity alerts
+                    await self._send_notifications(alerts)
                 
-                # Sleep before next alerting cycle
-                await asyncio.sleep(settings.ANOMALY_DETECTION_INTERVAL)
+                # Sleep before next alerting cycle, unless a full page suggests a backlog
+                if len(anomalies) < ANOMALY_PAGE_SIZE:
+                    await asyncio.sleep(settings.ANOMALY_DETECTION_INTERVAL)
             except asyncio.CancelledError:
                 logger.info("Alerting loop cancelled")
                 break
@@ -138,7 +179,7 @@ class AlertManager:
                 logger.error(f"Error in alerting loop: {str(e)}")
                 await asyncio.sleep(5)  # Sleep a bit before retrying
     
-    def _group_anomalies(self, anomalies: List[Anomaly]) -> Dict[str, List[Anomaly]]:
+    def _group_anomalies(self, anomalies: List[Anomaly]) -> Tuple[Dict[Tuple[str, str], List[Anomaly]], List[str]]:
         """
         Group anomalies by API, type, and other dimensions.
         
@@ -146,19 +187,16 @@ class AlertManager:
             anomalies: List of anomalies.
             
         Returns:
-            Dictionary of grouped anomalies.
+            Tuple of (grouped anomalies keyed by (API ID, anomaly type), anomaly IDs).
         """
-        grouped = {}
+        grouped = defaultdict(list)
+        anomaly_ids = []
         
         for anomaly in anomalies:
-            # Group by API ID and anomaly type
-            key = f"{anomaly.api_id}:{anomaly.type}"
-            
-            if key not in grouped:
-                grouped[key] = []
-            grouped[key].append(anomaly)
+            grouped[(anomaly.api_id, anomaly.type)].append(anomaly)
+            anomaly_ids.append(anomaly.id)
         
-        return grouped
+        return grouped, anomaly_ids
     
     async def _send_notifications(self, alerts: List[Alert]):
         """
@@ -167,33 +205,61 @@ class AlertManager:
         Args:
             alerts: List of alerts.
         """
-        for alert in alerts:
-            # Skip if already notified recently
-            if alert.id in self.alert_cache:
-                continue
-            
-            # Only send notifications for high and critical severity alerts
-            if alert.severity.lower() not in ['high', 'critical']:
-                continue
-            
+        if not self.notifiers:
+            return
+        
+        # Only notify for high and critical severity alerts not already
+        # notified within the dedup window
+        batch = [
+            alert for alert in alerts
+            if alert.severity_lc in _NOTIFY_SEVERITIES
+            and alert.id not in self.alert_cache
+        ]
+        
+        if not batch:
+            return
+        
+        # Dispatch every (alert, channel) send concurrently, bounded by a semaphore,
+        # so a slow channel or alert doesn't hold up the others. Channels that
+        # support batching get the whole batch in one send.
+        sem = asyncio.Semaphore(settings.NOTIFY_CONCURRENCY)
+        sends = []
+        for channel, notifier in self.notifiers.items():
+            if hasattr(notifier, "send_alerts_batch"):
+                sends.append(self._deliver(
+                    sem, channel, f"{len(batch)} alerts", notifier.send_alerts_batch(batch)
+                ))
+            else:
+                sends.extend(
+                    self._deliver(sem, channel, f"alert {alert.id}", notifier.send_alert(alert))
+                    for alert in batch
+                )
+        
+        await asyncio.gather(*sends, return_exceptions=True)
+        
+        # Add to cache to avoid duplicate notifications
+        for alert in batch:
+            self.alert_cache[alert.id] = None
+    
+    async def _deliver(self, sem: asyncio.Semaphore, channel: str, target: str, send):
+        """
+        Run one notification send under the concurrency limit and timeout.
+        
+        Args:
+            sem: Semaphore bounding concurrent sends.
+            channel: The channel name.
+            target: Description of what is being sent, for logging.
+            send: The send coroutine.
+        """
+        timeout = self.notify_timeouts.get(channel, settings.NOTIFY_TIMEOUT_SECONDS)
+        async with sem:
             try:
-                # Send to all configured notification channels
-                for channel, notifier in self.notifiers.items():
-                    try:
-                        await notifier.send_alert(alert)
-                        logger.info(f"Sent alert {alert.id} notification via {channel}")
-                    except Exception as e:
-                        logger.error(f"Error sending {channel} notification for alert {alert.id}: {str(e)}")
-                
-                # Add to cache to avoid duplicate notifications
-                self.alert_cache.add(alert.id)
-                
-                # Trim cache if it gets too large
-                if len(self.alert_cache) > 1000:
-                    self.alert_cache = set(list(self.alert_cache)[-500:])
-            
+                await asyncio.wait_for(send, timeout=timeout)
+                logger.info(f"Sent {target} notification via {channel}")
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out sending {channel} notification for {target} after {timeout}s")
             except Exception as e:
-                logger.error(f"Error processing notifications for alert {alert.id}: {str(e)}")
+                logger.error(f"Error sending {channel} notification for {target}: {str(e)}")
     
     async def resolve_alert(self, alert_id: str, resolved_by: str):
         """
@@ -219,8 +285,7 @@ class AlertManager:
             logger.info(f"Alert {alert_id} resolved by {resolved_by}")
             
             # Remove from cache
-            if alert_id in self.alert_cache:
-                self.alert_cache.remove(alert_id)
+            self.alert_cache.pop(alert_id, None)
         
         except Exception as e:
             logger.error(f"Error resolving alert {alert_id}: {str(e)}")
@@ -273,7 +338,8 @@ class AlertManager:
                 return
             
             # Calculate snooze end time
-            snooze_until = datetime.utcnow() + timedelta(minutes=duration_minutes)
+            now = datetime.utcnow()
+            snooze_until = now + timedelta(minutes=duration_minutes)
             
             # Update alert in database
             await self.db.update_alert(
@@ -281,7 +347,7 @@ class AlertManager:
                 updates={
                     "status": "snoozed",
                     "updated_by": snoozed_by,
-                    "updated_at": datetime.utcnow(),
+                    "updated_at": now,
                     "snooze_until": snooze_until,
                     "metadata": {
                         **(alert.metadata or {}),
@@ -293,8 +359,7 @@ class AlertManager:
             logger.info(f"Alert {alert_id} snoozed for {duration_minutes} minutes by {snoozed_by}")
             
             # Remove from cache
-            if alert_id in self.alert_cache:
-                self.alert_cache.remove(alert_id)
+            self.alert_cache.pop(alert_id, None)
         
         except Exception as e:
             logger.error(f"Error snoozing alert {alert_id}: {str(e)}")
@@ -4,14 +4,80 @@ Email notification channel for alerts.
 import logging
 import smtplib
 import asyncio
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from email.message import EmailMessage
 from typing import List, Optional, Dict, Any
 
 from src.models.api import Alert
 
 logger = logging.getLogger(__name__)
 
+# Socket timeout for SMTP operations, in seconds
+SMTP_TIMEOUT = 15
+
+# Threads dedicated to SMTP work. Sends share one connection and serialize on
+# its lock, so extra threads would only queue behind it.
+SMTP_WORKERS = 1
+
+# Severity levels with a CSS class in the HTML template
+_SEVERITY_CSS = frozenset(("critical", "high", "medium", "low"))
+
+# Email body templates, parsed once at import rather than rebuilt per alert
+_HTML_TEMPLATE = Template("""
+        <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; }
+                .header { background-color: #f8f9fa; padding: 10px; }
+                .alert-critical { color: #721c24; background-color: #f8d7da; }
+                .alert-high { color: #856404; background-color: #fff3cd; }
+                .alert-medium { color: #0c5460; background-color: #d1ecf1; }
+                .alert-low { color: #155724; background-color: #d4edda; }
+                .content { padding: 15px; }
+                .footer { font-size: 12px; color: #6c757d; margin-top: 20px; }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h2>API Monitoring System Alert</h2>
+            </div>
+            <div class="content alert-${severity_class}">
+                <h3>${title}</h3>
+                <p><strong>Alert ID:</strong> ${id}</p>
+                <p><strong>Severity:</strong> ${severity}</p>
+                <p><strong>Status:</strong> ${status}</p>
+                <p><strong>API:</strong> ${api_name}</p>
+                <p><strong>Environment:</strong> ${environment}</p>
+                <p><strong>Created At:</strong> ${created_at}</p>
+                <p><strong>Description:</strong><br>${description}</p>
+            </div>
+            <div class="footer">
+                This is an automated alert from the API Monitoring System.
+            </div>
+        </body>
+        </html>
+        """)
+
+_TEXT_TEMPLATE = Template("""
+        API Monitoring System Alert
+        
+        ${title}
+        
+        Alert ID: ${id}
+        Severity: ${severity}
+        Status: ${status}
+        API: ${api_name}
+        Environment: ${environment}
+        Created At: ${created_at}
+        
+        Description:
+        ${description}
+        
+        This is an automated alert from the API Monitoring System.
+        """)
+
 class EmailNotifier:
     """
     Notifier for sending alerts via email.
@@ -42,6 +108,92 @@ class EmailNotifier:
         self.password = password
         self.from_address = from_address
         self.recipients = recipients or []
+        
+        # SMTP connection kept open between alerts; the lock serializes its
+        # use across the executor threads that send the emails
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = threading.Lock()
+        
+        # Dedicated executor so SMTP latency doesn't tie up the loop's
+        # default executor used by other blocking calls
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the SMTP executor, creating it on first use.
+        
+        Returns:
+            The thread pool that runs the blocking SMTP operations.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=SMTP_WORKERS, thread_name_prefix="smtp")
+        return self._executor
+    
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Open and authenticate a new SMTP connection.
+        
+        Returns:
+            The connected SMTP client.
+        """
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+        server.login(self.username, self.password)
+        return server
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """
+        Get the open SMTP connection, reconnecting if it has gone stale.
+        Must be called with the SMTP lock held.
+        
+        Returns:
+            A live SMTP client.
+        """
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_connection()
+        
+        self._smtp = self._connect()
+        return self._smtp
+    
+    def _close_connection(self):
+        """
+        Close the SMTP connection, if any. Must be called with the SMTP lock held.
+        """
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+    
+    def close(self):
+        """
+        Close the SMTP connection and release the SMTP executor.
+        """
+        with self._smtp_lock:
+            self._close_connection()
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    async def aclose(self):
+        """
+        Close the SMTP connection without blocking the event loop.
+        """
+        if self._executor is None and self._smtp is None:
+            return
+        
+        # Not on the SMTP executor: close() shuts that executor down
+        await asyncio.to_thread(self.close)
     
     async def send_alert(self, alert: Alert, recipients: Optional[List[str]] = None) -> bool:
         """
@@ -69,7 +221,7 @@ class EmailNotifier:
             # Run the SMTP operations in a thread pool to avoid blocking
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
-                None, 
+                self._get_executor(),
                 self._send_email,
                 to_addresses,
                 subject,
@@ -88,6 +240,105 @@ class EmailNotifier:
             logger.error(f"Error sending alert {alert.id} via email: {str(e)}")
             return False
     
+    async def send_alerts_batch(self, alerts: List[Alert]) -> List[bool]:
+        """
+        Send several alert emails over a single SMTP session.
+        
+        Args:
+            alerts: The alerts to send, each to the default recipients.
+            
+        Returns:
+            List of booleans, one per alert, indicating whether it was sent.
+        """
+        if not alerts:
+            return []
+        
+        if not self.recipients:
+            logger.warning(f"No recipients for {len(alerts)} alerts, emails not sent")
+            return [False] * len(alerts)
+        
+        msgs = []
+        for alert in alerts:
+            subject = f"{alert.severity.upper()} Alert: {alert.title}"
+            html_body, text_body = self._format_alert(alert)
+            msgs.append(self._build_message(self.recipients, subject, text_body, html_body))
+        
+        # Run the whole batch in one thread pool call to amortize the SMTP round-trips
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(self._get_executor(), self._send_batch, msgs)
+        
+        for alert, result in zip(alerts, results):
+            if result:
+                logger.info(f"Successfully sent alert {alert.id} via email to {', '.join(self.recipients)}")
+            else:
+                logger.error(f"Failed to send alert {alert.id} via email")
+        
+        return results
+    
+    def _build_message(
+        self,
+        to_addresses: List[str],
+        subject: str,
+        text_body: str,
+        html_body: str
+    ) -> EmailMessage:
+        """
+        Build a multipart email message.
+        
+        Args:
+            to_addresses: List of recipient addresses.
+            subject: Email subject.
+            text_body: Plain text email body.
+            html_body: HTML email body.
+            
+        Returns:
+            The email message.
+        """
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.from_address
+        msg["To"] = ", ".join(to_addresses)
+        
+        # Plain text body with an HTML alternative
+        msg.set_content(text_body)
+        msg.add_alternative(html_body, subtype="html")
+        return msg
+    
+    def _send_batch(self, msgs: List[EmailMessage]) -> List[bool]:
+        """
+        Send email messages over one SMTP session.
+        
+        Args:
+            msgs: The email messages to send.
+            
+        Returns:
+            List of booleans, one per message, indicating whether it was sent.
+        """
+        results = []
+        with self._smtp_lock:
+            try:
+                server = self._get_connection()
+            except Exception as e:
+                logger.error(f"Error connecting to SMTP server: {str(e)}")
+                return [False] * len(msgs)
+            
+            for msg in msgs:
+                try:
+                    # Reconnect once if the server dropped the connection
+                    # since the NOOP check
+                    try:
+                        server.send_message(msg)
+                    except smtplib.SMTPServerDisconnected:
+                        self._close_connection()
+                        server = self._get_connection()
+                        server.send_message(msg)
+                    results.append(True)
+                except Exception as e:
+                    logger.error(f"Error in SMTP operation: {str(e)}")
+                    results.append(False)
+        
+        return results
+    
     def _send_email(
         self, 
         to_addresses: List[str],
@@ -107,31 +358,8 @@ class EmailNotifier:
         Returns:
             True if the email was sent successfully, False otherwise.
         """
-        try:
-            # Create multipart message
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = self.from_address
-            msg["To"] = ", ".join(to_addresses)
-            
-            # Add text and HTML parts
-            text_part = MIMEText(text_body, "plain")
-            html_part = MIMEText(html_body, "html")
-            msg.attach(text_part)
-            msg.attach(html_part)
-            
-            # Connect to SMTP server and send email
-            with smtplib.SMTP(self.host, self.port) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in SMTP operation: {str(e)}")
-            return False
+        msg = self._build_message(to_addresses, subject, text_body, html_body)
+        return self._send_batch([msg])[0]
     
     def _format_alert(self, alert: Alert) -> tuple[str, str]:
         """
@@ -143,59 +371,23 @@ class EmailNotifier:
         Returns:
             Tuple of (html_body, text_body).
         """
-        # Format HTML body
-        html_body = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; }}
-                .header {{ background-color: #f8f9fa; padding: 10px; }}
-                .alert-critical {{ color: #721c24; background-color: #f8d7da; }}
-                .alert-high {{ color: #856404; background-color: #fff3cd; }}
-                .alert-medium {{ color: #0c5460; background-color: #d1ecf1; }}
-                .alert-low {{ color: #155724; background-color: #d4edda; }}
-                .content {{ padding: 15px; }}
-                .footer {{ font-size: 12px; color: #6c757d; margin-top: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h2>API Monitoring System Alert</h2>
-            </div>
-            <div class="content alert-{alert.severity.lower()}">
-                <h3>{alert.title}</h3>
-                <p><strong>Alert ID:</strong> {alert.id}</p>
-                <p><strong>Severity:</strong> {alert.severity}</p>
-                <p><strong>Status:</strong> {alert.status}</p>
-                <p><strong>API:</strong> {alert.api_name}</p>
-                <p><strong>Environment:</strong> {alert.environment}</p>
-                <p><strong>Created At:</strong> {alert.created_at.strftime("%Y-%m-%d %H:%M:%S UTC")}</p>
-                <p><strong>Description:</strong><br>{alert.description}</p>
-            </div>
-            <div class="footer">
-                This is an automated alert from the API Monitoring System.
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Format plain text body
-        text_body = f"""
-        API Monitoring System Alert
-        
-        {alert.title}
+        severity_class = alert.severity_lc
+        if severity_class not in _SEVERITY_CSS:
+            severity_class = "unknown"
         
-        Alert ID: {alert.id}
-        Severity: {alert.severity}
-        Status: {alert.status}
-        API: {alert.api_name}
-        Environment: {alert.environment}
-        Created At: {alert.created_at.strftime("%Y-%m-%d %H:%M:%S UTC")}
+        fields = {
+            "severity_class": severity_class,
+            "title": alert.title,
+            "id": alert.id,
+            "severity": alert.severity,
+            "status": alert.status,
+            "api_name": alert.api_name,
+            "environment": alert.environment,
+            "created_at": f"{alert.created_at.isoformat(sep=' ', timespec='seconds')} UTC",
+            "description": alert.description
+        }
         
-        Description:
-        {alert.description}
-        
-        This is an automated alert from the API Monitoring System.
-        """
+        html_body = _HTML_TEMPLATE.substitute(fields)
+        text_body = _TEXT_TEMPLATE.substitute(fields)
         
         return html_body, text_body 
\ No newline at end of file
@@ -1,15 +1,39 @@
 """
 Slack notification channel for alerts.
 """
-import json
+import asyncio
 import logging
 import aiohttp
-from typing import Dict, Any
+import orjson
+from types import MappingProxyType
+from typing import Dict, Any, Optional
 
 from src.models.api import Alert
 
 logger = logging.getLogger(__name__)
 
+# Attachment color for each severity level
+_SEVERITY_COLORS = MappingProxyType({
+    "critical": "#FF0000",  # Red
+    "high": "#FFA500",      # Orange
+    "medium": "#FFFF00",    # Yellow
+    "low": "#00FF00"        # Green
+})
+_DEFAULT_COLOR = "#808080"  # Gray
+
+# Constant parts of the alert attachment; _format_alert copies these and
+# fills in the per-alert values
+_FIELD_SKELETONS = (
+    {"title": "Severity", "short": True},
+    {"title": "Status", "short": True},
+    {"title": "API", "short": True},
+    {"title": "Environment", "short": True},
+    {"title": "Created At", "short": False}
+)
+_ATTACHMENT_SKELETON = MappingProxyType({
+    "footer": "API Monitoring System"
+})
+
 class SlackNotifier:
     """
     Notifier for sending alerts to Slack.
@@ -22,6 +46,32 @@ class SlackNotifier:
             webhook_url: The Slack webhook URL.
         """
         self.webhook_url = webhook_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared HTTP session, creating it on first use.
+        
+        Returns:
+            The aiohttp session used for all webhook posts.
+        """
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                # Keep connections to the webhook host alive between alerts
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+                    timeout=aiohttp.ClientTimeout(total=10)
+                )
+            return self._session
+    
+    async def aclose(self):
+        """
+        Close the shared HTTP session.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     async def send_alert(self, alert: Alert) -> bool:
         """
@@ -34,22 +84,22 @@ class SlackNotifier:
             True if the alert was sent successfully, False otherwise.
         """
         try:
-            # Create Slack message
-            message = self._format_alert(alert)
+            # Create Slack message, serialized up front with orjson
+            body = orjson.dumps(self._format_alert(alert))
             
             # Send message to Slack webhook
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.webhook_url,
-                    json=message,
-                    headers={"Content-Type": "application/json"}
-                ) as response:
-                    if response.status == 200:
-                        logger.info(f"Successfully sent alert {alert.id} to Slack")
-                        return True
-                    else:
-                        logger.error(f"Failed to send alert {alert.id} to Slack. Status: {response.status}")
-                        return False
+            session = await self._get_session()
+            async with session.post(
+                self.webhook_url,
+                data=body,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.status == 200:
+                    logger.info(f"Successfully sent alert {alert.id} to Slack")
+                    return True
+                else:
+                    logger.error(f"Failed to send alert {alert.id} to Slack. Status: {response.status}")
+                    return False
                         
         except Exception as e:
             logger.error(f"Error sending alert {alert.id} to Slack: {str(e)}")
@@ -65,52 +115,28 @@ class SlackNotifier:
         Returns:
             The formatted Slack message.
         """
-        # Determine color based on severity
-        color = self._get_severity_color(alert.severity)
-        
-        # Create message attachments
-        attachments = [
-            {
-                "color": color,
-                "title": f"API Alert: {alert.title}",
-                "title_link": f"/alerts/{alert.id}",
-                "text": alert.description,
-                "fields": [
-                    {
-                        "title": "Severity",
-                        "value": alert.severity,
-                        "short": True
-                    },
-                    {
-                        "title": "Status",
-                        "value": alert.status,
-                        "short": True
-                    },
-                    {
-                        "title": "API",
-                        "value": alert.api_name,
-                        "short": True
-                    },
-                    {
-                        "title": "Environment",
-                        "value": alert.environment,
-                        "short": True
-                    },
-                    {
-                        "title": "Created At",
-                        "value": alert.created_at.strftime("%Y-%m-%d %H:%M:%S UTC"),
-                        "short": False
-                    }
-                ],
-                "footer": "API Monitoring System",
-                "ts": int(alert.created_at.timestamp())
-            }
-        ]
+        # Patch the per-alert values into copies of the constant skeletons
+        values = (
+            alert.severity,
+            alert.status,
+            alert.api_name,
+            alert.environment,
+            f"{alert.created_at.isoformat(sep=' ', timespec='seconds')} UTC"
+        )
+        attachment = {
+            **_ATTACHMENT_SKELETON,
+            "color": self._get_severity_color(alert.severity_lc),
+            "title": f"API Alert: {alert.title}",
+            "title_link": f"/alerts/{alert.id}",
+            "text": alert.description,
+            "fields": [{**field, "value": value} for field, value in zip(_FIELD_SKELETONS, values)],
+            "ts": int(alert.created_at.timestamp())
+        }
         
         # Create main message
         message = {
             "text": f"*{alert.severity.upper()} Alert*: {alert.title}",
-            "attachments": attachments
+            "attachments": [attachment]
         }
         
         return message
@@ -120,15 +146,9 @@ class SlackNotifier:
         Get the color for the severity level.
         
         Args:
-            severity: The severity level.
+            severity: The lowercase severity level.
             
         Returns:
             The color for the severity level.
         """
-        severity_colors = {
-            "critical": "#FF0000",  # Red
-            "high": "#FFA500",      # Orange
-            "medium": "#FFFF00",    # Yellow
-            "low": "#00FF00"        # Green
-        }
-        return severity_colors.get(severity.lower(), "#808080")  # Default gray 
\ No newline at end of file
+        return _SEVERITY_COLORS.get(severity, _DEFAULT_COLOR) 
\ No newline at end of file
@@ -2,8 +2,12 @@
 Analyzer manager for API monitoring system.
 """
 import asyncio
+import itertools
 import logging
-from typing import Dict, List, Optional, Any
+import math
+import sys
+from collections import defaultdict
+from typing import Any, Coroutine, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 from config.settings import Settings
@@ -20,6 +24,26 @@ logger = logging.getLogger(__name__)
 # Create settings instance
 settings = Settings()
 
+# Most recent metrics analyzed per API, and across all APIs by global analyzers
+METRICS_PER_API_LIMIT = 1000
+GLOBAL_METRICS_LIMIT = 1000
+
+# Size of the shared per-cycle metrics fetch (Elasticsearch's default
+# max_result_window). A window holding more metrics than this falls back to
+# one query per API.
+METRICS_FETCH_LIMIT = 10000
+
+# On Python 3.12+ analysis tasks start eagerly: the coroutine runs synchronously
+# until its first suspension, so analyses that finish without awaiting never
+# go through the event loop's ready queue (CPython gh-97696)
+_EAGER_TASKS = sys.version_info >= (3, 12)
+
+def _create_task(coro: Coroutine) -> asyncio.Task:
+    """Create an analysis task, starting it eagerly where supported"""
+    if _EAGER_TASKS:
+        return asyncio.Task(coro, loop=asyncio.get_running_loop(), eager_start=True)
+    return asyncio.create_task(coro)
+
 class AnalyzerManager:
     """
     Manager for API analyzers.
@@ -34,6 +58,15 @@ class AnalyzerManager:
         self.analysis_tasks = []
         self.global_analyzers = []
         
+        # When API sources were last checked for changes, and a hash of each
+        # source's configuration so unchanged sources can be skipped
+        self._last_config_check: Optional[datetime] = None
+        self._config_hashes: Dict[str, int] = {}
+        
+        # Per-cycle schedule of (API ID, analyzers), rebuilt only after
+        # analyzers are added or removed
+        self._schedule: Optional[List[Tuple[str, List[BaseAnalyzer]]]] = None
+        
         # Initialize global analyzers (analyzers that work across all APIs)
         self._init_global_analyzers()
     
@@ -82,11 +115,13 @@ class AnalyzerManager:
         Load API sources from the database and initialize analyzers.
         """
         try:
+            check_time = datetime.utcnow()
             api_sources = await self.db.get_api_sources()
             logger.info(f"Loaded {len(api_sources)} API sources for analysis")
             
             for api_source in api_sources:
                 await self.add_analyzers(api_source)
+            self._last_config_check = check_time
         except Exception as e:
             logger.error(f"Error loading API sources for analysis: {str(e)}")
     
@@ -96,14 +131,15 @@ class AnalyzerManager:
         """
         if api_source.id in self.analyzers:
             logger.debug(f"Analyzers for API {api_source.id} already exist, updating")
-            for analyzer in self.analyzers[api_source.id]:
-                analyzer.update_config(api_source)
+            self._update_analyzers(api_source)
             return
         
         # Create analyzers for this API
         api_analyzers = self._create_analyzers(api_source)
         if api_analyzers:
             self.analyzers[api_source.id] = api_analyzers
+            self._config_hashes[api_source.id] = self._config_hash(api_source)
+            self._schedule = None
             logger.info(f"Added {len(api_analyzers)} analyzers for API {api_source.name} ({api_source.id})")
         else:
             logger.warning(f"Could not create analyzers for API {api_source.name}")
@@ -117,8 +153,29 @@ class AnalyzerManager:
             for analyzer in self.analyzers[api_id]:
                 analyzer.cleanup()
             del self.analyzers[api_id]
+            self._config_hashes.pop(api_id, None)
+            self._schedule = None
             logger.info(f"Removed analyzers for API {api_id}")
     
+    @staticmethod
+    def _config_hash(api_source: ApiSource) -> int:
+        """
+        Hash an API source's configuration, ignoring its update timestamp.
+        """
+        return hash(api_source.json(exclude={"updated_at"}))
+    
+    def _update_analyzers(self, api_source: ApiSource):
+        """
+        Update an API's analyzers with its latest configuration, if it changed.
+        """
+        config_hash = self._config_hash(api_source)
+        if self._config_hashes.get(api_source.id) == config_hash:
+            return
+        
+        for analyzer in self.analyzers[api_source.id]:
+            analyzer.update_config(api_source)
+        self._config_hashes[api_source.id] = config_hash
+    
     def _create_analyzers(self, api_source: ApiSource) -> List[BaseAnalyzer]:
         """
         Create analyzers for an API source.
@@ -143,6 +200,13 @@ class AnalyzerManager:
         """
         Main analysis loop.
         """
+        # Run cycles on a fixed cadence: sleep only for what is left of the
+        # interval, so analysis time doesn't push later cycles back
+        loop = asyncio.get_running_loop()
+        interval = settings.ANOMALY_DETECTION_INTERVAL
+        next_deadline = loop.time() + interval
+        overruns = 0
+        
         while self.running:
             try:
                 # Check for any configuration changes
@@ -152,28 +216,53 @@ class AnalyzerManager:
                 window_end = datetime.utcnow()
                 window_start = window_end - timedelta(seconds=settings.ANOMALY_DETECTION_WINDOW)
                 
-                # Analyze metrics for each API
-                analysis_tasks = []
-                for api_id, analyzers in self.analyzers.items():
-                    for analyzer in analyzers:
-                        task = asyncio.create_task(
-                            self._analyze_and_store(api_id, analyzer, window_start, window_end)
-                        )
-                        analysis_tasks.append(task)
+                # Fetch the window's metrics once and partition them by API. If
+                # the fetch was truncated, APIs query their own metrics instead.
+                all_metrics = await self.db.get_all_metrics(
+                    start_time=window_start,
+                    end_time=window_end,
+                    limit=METRICS_FETCH_LIMIT
+                )
+                metrics_complete = len(all_metrics) < METRICS_FETCH_LIMIT
+                metrics_by_api = defaultdict(list)
+                if metrics_complete:
+                    for metric in all_metrics:
+                        metrics_by_api[metric.api_id].append(metric)
+                global_metrics = all_metrics[:GLOBAL_METRICS_LIMIT]
                 
-                # Run global analyzers that work across all APIs
-                for analyzer in self.global_analyzers:
-                    task = asyncio.create_task(
-                        self._run_global_analyzer(analyzer, window_start, window_end)
+                # Analyze metrics for each API, then run global analyzers that
+                # work across all APIs. Coroutines are created lazily as pool
+                # slots free up.
+                if self._schedule is None:
+                    self._schedule = list(self.analyzers.items())
+                analyses = itertools.chain(
+                    (
+                        self._analyze_api(
+                            api_id, analyzers, window_start, window_end,
+                            metrics_by_api.get(api_id, []) if metrics_complete else None
+                        )
+                        for api_id, analyzers in self._schedule
+                    ),
+                    (
+                        self._run_global_analyzer(analyzer, global_metrics)
+                        for analyzer in self.global_analyzers
                     )
-                    analysis_tasks.append(task)
+                )
+                await self._run_bounded(analyses, settings.ANALYSIS_CONCURRENCY)
                 
-                if analysis_tasks:
-                    # Wait for all analysis tasks to complete
-                    await asyncio.gather(*analysis_tasks, return_exceptions=True)
+                # Sleep until the next cycle is due
+                now = loop.time()
+                sleep_for = max(0.0, next_deadline - now)
+                if sleep_for == 0:
+                    overruns += 1
+                    if overruns >= 2:
+                        logger.warning(f"Analysis cycle overrun by {(now - next_deadline) * 1000:.0f} ms")
+                else:
+                    overruns = 0
+                await asyncio.sleep(sleep_for)
                 
-                # Sleep before next analysis cycle
-                await asyncio.sleep(settings.ANOMALY_DETECTION_INTERVAL)
+                # Advance to the next tick, skipping any missed during an overrun
+                next_deadline += interval * max(1, math.ceil((now - next_deadline) / interval))
             except asyncio.CancelledError:
                 logger.info("Analysis loop cancelled")
                 break
@@ -181,28 +270,82 @@ class AnalyzerManager:
                 logger.error(f"Error in analysis loop: {str(e)}")
                 await asyncio.sleep(5)  # Sleep a bit before retrying
     
+    async def _run_bounded(self, coros: Iterable[Coroutine], limit: int):
+        """
+        Run coroutines with at most limit of them in flight at once.
+        """
+        coros = iter(coros)
+        
+        # A single analysis (e.g. one API in dev) needs no task or pool; run it inline
+        first = list(itertools.islice(coros, 2))
+        if len(first) == 1:
+            try:
+                await first[0]
+            except Exception as e:
+                logger.error(f"Unhandled error in analysis task: {str(e)}")
+            return
+        
+        coros = itertools.chain(first, coros)
+        pending = {_create_task(coro) for coro in itertools.islice(coros, limit)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        logger.error(f"Unhandled error in analysis task: {str(task.exception())}")
+                
+                # Refill the freed slots
+                pending.update(_create_task(coro) for coro in itertools.islice(coros, len(done)))
+        except asyncio.CancelledError:
+            for task in pending:
+                task.cancel()
+            raise
+    
+    async def _analyze_api(
+        self,
+        api_id: str,
+        analyzers: List[BaseAnalyzer],
+        window_start: datetime,
+        window_end: datetime,
+        metrics: Optional[List[ApiMetric]] = None
+    ):
+        """
+        Run all of an API's analyzers on its metrics, fetching them if not given.
+        """
+        if metrics is None:
+            try:
+                # Get metrics for the API in the time window
+                metrics = await self.db.get_metrics(
+                    api_id=api_id,
+                    start_time=window_start,
+                    end_time=window_end,
+                    limit=METRICS_PER_API_LIMIT
+                )
+            except Exception as e:
+                logger.error(f"Error getting metrics for API {api_id}: {str(e)}")
+                return
+        else:
+            # Metrics are newest first; keep the same cap as a per-API query
+            metrics = metrics[:METRICS_PER_API_LIMIT]
+        
+        if not metrics:
+            logger.debug(f"No metrics found for API {api_id} in the specified time window")
+            return
+        
+        await asyncio.gather(
+            *(self._analyze_and_store(api_id, analyzer, metrics) for analyzer in analyzers)
+        )
+    
     async def _analyze_and_store(
         self, 
         api_id: str, 
         analyzer: BaseAnalyzer, 
-        window_start: datetime, 
-        window_end: datetime
+        metrics: List[ApiMetric]
     ):
         """
         Analyze metrics and store results.
         """
         try:
-            # Get metrics for the API in the time window
-            metrics = await self.db.get_metrics(
-                api_id=api_id,
-                start_time=window_start,
-                end_time=window_end
-            )
-            
-            if not metrics:
-                logger.debug(f"No metrics found for API {api_id} in the specified time window")
-                return
-            
             # Detect anomalies
             anomalies = await analyzer.detect_anomalies(metrics)
             if anomalies:
@@ -222,19 +365,12 @@ class AnalyzerManager:
     async def _run_global_analyzer(
         self, 
         analyzer: BaseAnalyzer, 
-        window_start: datetime, 
-        window_end: datetime
+        metrics: List[ApiMetric]
     ):
         """
         Run a global analyzer that works across all APIs.
         """
         try:
-            # Get all metrics in the time window
-            metrics = await self.db.get_all_metrics(
-                start_time=window_start,
-                end_time=window_end
-            )
-            
             if not metrics:
                 logger.debug("No metrics found in the specified time window")
                 return
@@ -260,8 +396,13 @@ class AnalyzerManager:
         Check for configuration changes.
         """
         try:
-            # Get API sources from database
-            current_api_sources = await self.db.get_api_sources(active=True)
+            # Get API sources changed since the last check; the first check
+            # gets all of them
+            check_time = datetime.utcnow()
+            current_api_sources = await self.db.get_api_sources(
+                active=True,
+                updated_since=self._last_config_check
+            )
             
             # Check for new API sources
             current_api_ids = {api_source.id for api_source in current_api_sources}
@@ -269,6 +410,8 @@ class AnalyzerManager:
             
             # Commented out this part for debugging
             # APIs to remove (no longer in database or inactive)
+            # Note: re-enabling this needs the full active source list, not
+            # just the sources changed since the last check
             # for api_id in existing_api_ids - current_api_ids:
             #     self.remove_analyzers(api_id)
             
@@ -278,7 +421,8 @@ class AnalyzerManager:
                     await self.add_analyzers(api_source)
                 else:
                     # Update existing analyzers with latest configuration
-                    for analyzer in self.analyzers[api_source.id]:
-                        analyzer.update_config(api_source)
+                    self._update_analyzers(api_source)
+            
+            self._last_config_check = check_time
         except Exception as e:
             logger.error(f"Error checking configuration changes for analyzers: {str(e)}") 
\ No newline at end of file
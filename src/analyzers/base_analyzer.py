@@ -71,7 +71,8 @@ class BaseAnalyzer(abc.ABC):
         threshold: Optional[float] = None,
         environment: Optional[Environment] = None,
         context: Optional[Dict[str, Any]] = None,
-        related_anomalies: Optional[List[str]] = None
+        related_anomalies: Optional[List[str]] = None,
+        timestamp: Optional[datetime] = None
     ) -> Anomaly:
         """
         Create an anomaly.
@@ -87,16 +88,17 @@ class BaseAnalyzer(abc.ABC):
             environment: The environment where the anomaly was detected.
             context: Additional context information.
             related_anomalies: IDs of related anomalies.
+            timestamp: Detection time, defaults to now.
             
         Returns:
             An anomaly.
         """
         return Anomaly(
-            id=f"anom-{uuid.uuid4()}",
+            id=f"anom-{uuid.uuid4().hex}",
             api_id=api_id,
             type=anomaly_type,
             severity=severity,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp or datetime.utcnow(),
             description=description,
             metric_value=metric_value,
             expected_value=expected_value,
@@ -117,7 +119,8 @@ class BaseAnalyzer(abc.ABC):
         current_value: Optional[float] = None,
         trend: str = "increasing",
         environment: Optional[Environment] = None,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None
     ) -> Prediction:
         """
         Create a prediction.
@@ -133,16 +136,17 @@ class BaseAnalyzer(abc.ABC):
             trend: The trend direction (increasing, decreasing, stable).
             environment: The environment for which the prediction is made.
             context: Additional context information.
+            timestamp: Prediction time, defaults to now.
             
         Returns:
             A prediction.
         """
         return Prediction(
-            id=f"pred-{uuid.uuid4()}",
+            id=f"pred-{uuid.uuid4().hex}",
             api_id=api_id,
             type=prediction_type,
             confidence=confidence,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp or datetime.utcnow(),
             predicted_for=predicted_for,
             description=description,
             metric_value=metric_value,
@@ -153,6 +157,32 @@ class BaseAnalyzer(abc.ABC):
             predicted_issues=[prediction_type]
         )
     
+    def create_anomalies(self, rows: List[Dict[str, Any]]) -> List[Anomaly]:
+        """
+        Create anomalies from one detection pass, sharing a single timestamp.
+        
+        Args:
+            rows: Keyword arguments for create_anomaly, one dict per anomaly.
+            
+        Returns:
+            List of anomalies.
+        """
+        now = datetime.utcnow()
+        return [self.create_anomaly(**row, timestamp=now) for row in rows]
+    
+    def create_predictions(self, rows: List[Dict[str, Any]]) -> List[Prediction]:
+        """
+        Create predictions from one prediction pass, sharing a single timestamp.
+        
+        Args:
+            rows: Keyword arguments for create_prediction, one dict per prediction.
+            
+        Returns:
+            List of predictions.
+        """
+        now = datetime.utcnow()
+        return [self.create_prediction(**row, timestamp=now) for row in rows]
+    
     def cleanup(self):
         """
         Clean up resources.
@@ -593,6 +593,7 @@ class CrossEnvironmentAnalyzer(BaseAnalyzer):
                 Environment.GCP: 2,
                 Environment.OTHER: 3
             }
+            rows = []
             
             for problem_env, issue_types in problem_envs:
                 # Predict propagation to higher order environments
@@ -620,7 +621,7 @@ class CrossEnvironmentAnalyzer(BaseAnalyzer):
                             # Get current error rate in the problematic environment
                             problem_error_rate = self._calculate_error_rate(metrics_by_env[problem_env])
                             
-                            prediction = self.create_prediction(
+                            rows.append(dict(
                                 api_id=api_id,
                                 prediction_type="cross_environment_error_propagation",
                                 confidence=confidence,
@@ -636,15 +637,13 @@ class CrossEnvironmentAnalyzer(BaseAnalyzer):
                                     "current_source_error_rate": f"{problem_error_rate:.2%}",
                                     "prediction_basis": "Recent error rate increase in source environment"
                                 }
-                            )
-                            
-                            predictions.append(prediction)
+                            ))
                         
                         elif issue_type == "response_time":
                             # Get current response time in the problematic environment
                             problem_rt = np.mean([m.response_time for m in metrics_by_env[problem_env]])
                             
-                            prediction = self.create_prediction(
+                            rows.append(dict(
                                 api_id=api_id,
                                 prediction_type="cross_environment_response_time_propagation",
                                 confidence=confidence,
@@ -660,9 +659,9 @@ class CrossEnvironmentAnalyzer(BaseAnalyzer):
                                     "current_source_response_time": f"{problem_rt:.2f}ms",
                                     "prediction_basis": "Recent response time increase in source environment"
                                 }
-                            )
-                            
-                            predictions.append(prediction)
+                            ))
+            
+            predictions.extend(self.create_predictions(rows))
         
         return predictions
     
@@ -45,6 +45,7 @@ class ErrorRateAnalyzer(BaseAnalyzer):
         try:
             # Group metrics by endpoint
             metrics_by_endpoint = self._group_by_endpoint(metrics)
+            rows = []
             
             for endpoint, endpoint_metrics in metrics_by_endpoint.items():
                 # Skip if not enough data points
@@ -59,8 +60,7 @@ class ErrorRateAnalyzer(BaseAnalyzer):
                     # Calculate severity based on error rate
                     severity = min(1.0, error_rate * 5)  # Scale up to 1.0
                     
-                    # Create anomaly
-                    anomaly = self.create_anomaly(
+                    rows.append(dict(
                         api_id=self.api_source.id,
                         anomaly_type="high_error_rate",
                         severity=severity,
@@ -75,9 +75,9 @@ class ErrorRateAnalyzer(BaseAnalyzer):
                             "total_count": len(endpoint_metrics),
                             "time_range": f"{endpoint_metrics[0].timestamp.isoformat()} to {endpoint_metrics[-1].timestamp.isoformat()}"
                         }
-                    )
-                    
-                    anomalies.append(anomaly)
+                    ))
+            
+            anomalies.extend(self.create_anomalies(rows))
         
         except Exception as e:
             logger.error(f"Error detecting error rate anomalies: {str(e)}")
@@ -103,6 +103,7 @@ class ErrorRateAnalyzer(BaseAnalyzer):
         try:
             # Group metrics by endpoint
             metrics_by_endpoint = self._group_by_endpoint(metrics)
+            rows = []
             
             for endpoint, endpoint_metrics in metrics_by_endpoint.items():
                 # Skip if not enough data points
@@ -136,8 +137,7 @@ class ErrorRateAnalyzer(BaseAnalyzer):
                     # Calculate confidence based on data points and trend strength
                     confidence = min(0.9, 0.5 + (recent_error_rate / 0.1))
                     
-                    # Create prediction
-                    prediction = self.create_prediction(
+                    rows.append(dict(
                         api_id=self.api_source.id,
                         prediction_type="error_rate",
                         confidence=confidence,
@@ -155,9 +155,9 @@ class ErrorRateAnalyzer(BaseAnalyzer):
                             "recent_sample_size": len(recent_metrics),
                             "previous_sample_size": len(previous_metrics)
                         }
-                    )
-                    
-                    predictions.append(prediction)
+                    ))
+            
+            predictions.extend(self.create_predictions(rows))
         
         except Exception as e:
             logger.error(f"Error predicting error rate issues: {str(e)}")
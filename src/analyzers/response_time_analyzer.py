@@ -186,6 +186,7 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
         is_outlier = knn.predict(response_times_scaled)
         
         # Create anomalies for outliers
+        rows = []
         for i, (metric, score, outlier) in enumerate(zip(metrics, outlier_scores, is_outlier)):
             if outlier == 1 and score > self.anomaly_threshold:
                 # Calculate moving average as the expected value
@@ -200,8 +201,8 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
                 # Calculate severity based on how much the value exceeds the threshold
                 severity = min(1.0, (metric.response_time - expected_value) / expected_value)
                 
-                # Create anomaly
-                anomaly = self.create_anomaly(
+                # Collect anomaly; all are created together below
+                rows.append(dict(
                     api_id=self.api_source.id,
                     anomaly_type="response_time_spike",
                     severity=severity,
@@ -217,10 +218,9 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
                         "timestamp": metric.timestamp.isoformat(),
                         "outlier_score": float(score)
                     }
-                )
-                
-                anomalies.append(anomaly)
+                ))
         
+        anomalies.extend(self.create_anomalies(rows))
         return anomalies
     
     def _detect_pattern_changes(self, endpoint: str, metrics: List[ApiMetric]) -> List[Anomaly]:
@@ -276,6 +276,7 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
                     consecutive_count = 0
             
             # Create anomalies for pattern changes
+            rows = []
             for i in pattern_change_indices:
                 metric = metrics[i]
                 
@@ -289,8 +290,8 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
                 score = anomaly_scores[i]
                 severity = min(1.0, float(score) / 0.5)  # Normalize score
                 
-                # Create anomaly
-                anomaly = self.create_anomaly(
+                # Collect anomaly; all are created together below
+                rows.append(dict(
                     api_id=self.api_source.id,
                     anomaly_type="response_time_pattern_change",
                     severity=severity,
@@ -307,9 +308,9 @@ class ResponseTimeAnalyzer(BaseAnalyzer):
                         "historical_mean": float(expected_value),
                         "recent_mean": float(np.mean(current_times[-10:]))
                     }
-                )
-                
-                anomalies.append(anomaly)
+                ))
+            
+            anomalies.extend(self.create_anomalies(rows))
         
         except Exception as e:
             logger.error(f"Error detecting pattern changes: {str(e)}")
@@ -97,6 +97,11 @@ class Alert(BaseModel):
     environments: List[Environment]
     tags: List[str]
     metadata: Dict[str, Any]
+    
+    @property
+    def severity_lc(self) -> str:
+        """Lowercase severity, as used for notification filtering and styling."""
+        return self.severity.lower()
 
 class AnomalyTriggerRequest(BaseModel):
     """Anomaly trigger request model for demo purposes."""
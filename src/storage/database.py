@@ -19,6 +19,9 @@ logger = logging.getLogger(__name__)
 # Create settings instance
 settings = Settings()
 
+# Maximum number of IDs in a single $in filter when updating anomalies
+MARK_PROCESSED_CHUNK_SIZE = 1000
+
 class Database:
     """
     Database access layer that handles interactions with MongoDB and Elasticsearch.
@@ -32,6 +35,9 @@ class Database:
         self.initialized = False
         self.es_available = False
         self.mongo_available = False
+        # Whether MongoDB supports multi-document transactions (replica set or
+        # sharded cluster); None until the first attempt
+        self.transactions_supported: Optional[bool] = None
     
     async def connect(self):
         """
@@ -685,10 +691,13 @@ class Database:
         
         return anomalies
     
-    async def get_unprocessed_anomalies(self) -> List[Anomaly]:
+    async def get_unprocessed_anomalies(self, limit: Optional[int] = None) -> List[Anomaly]:
         """
         Get unprocessed anomalies from MongoDB.
         
+        Args:
+            limit: Optional maximum number of anomalies to return.
+        
         Returns:
             List of unprocessed anomalies.
         """
@@ -696,6 +705,8 @@ class Database:
         
         # Query for unprocessed anomalies
         cursor = self.mongo_db.anomalies.find({"processed": False}).sort("timestamp", -1)
+        if limit:
+            cursor = cursor.limit(limit)
         
         # Convert results to Pydantic models
         anomalies = []
@@ -721,12 +732,13 @@ class Database:
         
         return anomalies
     
-    async def mark_anomalies_processed(self, anomaly_ids: List[str]) -> int:
+    async def mark_anomalies_processed(self, anomaly_ids: List[str], session=None) -> int:
         """
         Mark anomalies as processed.
         
         Args:
             anomaly_ids: List of anomaly IDs to mark as processed.
+            session: Optional MongoDB session to run the update in.
             
         Returns:
             Number of anomalies marked as processed.
@@ -736,13 +748,17 @@ class Database:
         if not anomaly_ids:
             return 0
         
-        # Update anomalies
-        result = await self.mongo_db.anomalies.update_many(
-            {"id": {"$in": anomaly_ids}},
-            {"$set": {"processed": True}}
-        )
+        # Update anomalies in chunks to keep each $in filter small
+        modified = 0
+        for start in range(0, len(anomaly_ids), MARK_PROCESSED_CHUNK_SIZE):
+            result = await self.mongo_db.anomalies.update_many(
+                {"id": {"$in": anomaly_ids[start:start + MARK_PROCESSED_CHUNK_SIZE]}},
+                {"$set": {"processed": True}},
+                session=session
+            )
+            modified += result.modified_count
         
-        return result.modified_count
+        return modified
     
     # Prediction methods
     
@@ -854,12 +870,13 @@ class Database:
     
     # Alert methods
     
-    async def store_alerts(self, alerts: List[Alert]) -> int:
+    async def store_alerts(self, alerts: List[Alert], session=None) -> int:
         """
         Store alerts in MongoDB.
         
         Args:
             alerts: List of alerts to store.
+            session: Optional MongoDB session to run the insert in.
             
         Returns:
             Number of alerts stored.
@@ -881,13 +898,53 @@ class Database:
         
         if operations:
             # Execute bulk operation
-            result = await self.mongo_db.alerts.bulk_write(operations)
+            result = await self.mongo_db.alerts.bulk_write(operations, session=session)
             
             logger.debug(f"Stored {len(alerts)} alerts")
             return result.inserted_count
         
         return 0
     
+    async def store_alerts_and_mark(self, alerts: List[Alert], anomaly_ids: List[str]) -> tuple[int, int]:
+        """
+        Store alerts and mark the anomalies they were generated from as processed.
+        
+        Both writes run in one transaction so anomalies are never marked
+        processed without their alerts. Where MongoDB doesn't support
+        transactions (standalone server), the alerts are stored first and the
+        anomalies are only marked once that succeeds.
+        
+        Args:
+            alerts: List of alerts to store.
+            anomaly_ids: List of anomaly IDs to mark as processed.
+            
+        Returns:
+            Tuple of (alerts stored, anomalies marked as processed).
+        """
+        await self._ensure_connection()
+        
+        if self.transactions_supported is not False:
+            async def write(session):
+                stored = await self.store_alerts(alerts, session=session)
+                marked = await self.mark_anomalies_processed(anomaly_ids, session=session)
+                return stored, marked
+            
+            try:
+                async with await self.mongo_client.start_session() as session:
+                    result = await session.with_transaction(write)
+                self.transactions_supported = True
+                return result
+            except pymongo.errors.OperationFailure as e:
+                # IllegalOperation: transactions need a replica set or mongos
+                if e.code != 20:
+                    raise
+                logger.info("MongoDB transactions not supported, storing alerts before marking anomalies")
+                self.transactions_supported = False
+        
+        stored = await self.store_alerts(alerts)
+        marked = await self.mark_anomalies_processed(anomaly_ids)
+        return stored, marked
+    
     async def get_alerts(
         self,
         api_id: Optional[str] = None,